@@ -0,0 +1,243 @@
+# app/assets.py
+"""
+Static asset pipeline.
+
+`python -m app.assets build` copies every file in static/ (except index.html) to
+static/dist/<stem>.<hash><ext>, writes .gz (and .br when `brotli` is installed) next to
+each compressible file, rewrites index.html to reference the hashed names and records
+the mapping in static/dist/manifest.json. A rebuild under a running app is safe: files
+are replaced atomically, and hashed files of the previous build are kept (pages still
+showing the old index can load them). Anything older is pruned.
+
+At runtime hashed files are served with `Cache-Control: immutable` and the best
+precompressed variant the client accepts; the index is held in memory (with gzip/br
+variants and an ETag), reloaded when the build changes, and revalidated on every visit.
+"""
+from __future__ import annotations
+import gzip, hashlib, json, mimetypes, os, re, sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional: gzip-only without it
+    brotli = None
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+DIST = "dist"
+HASH_LEN = 10
+HASHED_NAME = re.compile(rf"\.[0-9a-f]{{{HASH_LEN}}}\.[A-Za-z0-9]+$")
+COMPRESSIBLE = {".js", ".css", ".html", ".svg", ".json", ".txt", ".map", ".ico", ".wasm"}
+MIN_COMPRESS_BYTES = 256
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+# --- build ---
+
+def _compress_variants(data: bytes) -> Dict[str, bytes]:
+    out = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        out["br"] = brotli.compress(data, quality=11)
+    return out
+
+
+_EXT = {"gzip": ".gz", "br": ".br"}
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # a running app never sees a half-written file
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _write_with_variants(path: Path, data: bytes) -> None:
+    _write_atomic(path, data)
+    if path.suffix in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+        for enc, blob in _compress_variants(data).items():
+            if len(blob) < len(data):
+                _write_atomic(path.with_name(path.name + _EXT[enc]), blob)
+
+
+def _read_manifest(dist: Path) -> Dict[str, str]:
+    try:
+        return json.loads((dist / "manifest.json").read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _prune(dist: Path, keep) -> None:
+    """Delete hashed files (and their variants) not in `keep`."""
+    for p in list(dist.rglob("*")):
+        rel = p.relative_to(dist).as_posix()
+        base = next((rel[:-len(ext)] for ext in _EXT.values() if rel.endswith(ext)), rel)
+        if p.is_file() and HASHED_NAME.search(base) and base not in keep:
+            p.unlink()
+
+
+def rewrite_refs(html: str, manifest: Dict[str, str]) -> str:
+    """Point src/href attributes at fingerprinted files ('./x.css', 'x.css', '/static/x.css')."""
+    def sub(m):
+        ref = m.group(2)
+        key = re.sub(r"^(\./|/static/)", "", ref)
+        if key in manifest:
+            return f'{m.group(1)}="/static/{DIST}/{manifest[key]}"'
+        return m.group(0)
+    return re.sub(r'\b(src|href)="([^"?#]+)"', sub, html)
+
+
+def build(static_dir: Path = STATIC_DIR) -> Dict[str, str]:
+    dist = static_dir / DIST
+    dist.mkdir(parents=True, exist_ok=True)
+    previous = _read_manifest(dist)
+
+    manifest: Dict[str, str] = {}
+    for src in sorted(p for p in static_dir.rglob("*") if p.is_file() and DIST not in p.relative_to(static_dir).parts):
+        rel = src.relative_to(static_dir)
+        if rel.as_posix() == "index.html":
+            continue
+        data = src.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:HASH_LEN]
+        hashed = rel.with_name(f"{rel.stem}.{digest}{rel.suffix}")
+        (dist / hashed).parent.mkdir(parents=True, exist_ok=True)
+        if not (dist / hashed).exists():   # same name, same content
+            _write_with_variants(dist / hashed, data)
+        manifest[rel.as_posix()] = hashed.as_posix()
+
+    index = static_dir / "index.html"
+    if index.exists():
+        _write_with_variants(dist / "index.html", rewrite_refs(index.read_text(), manifest).encode())
+    _write_atomic(dist / "manifest.json", json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _prune(dist, set(manifest.values()) | set(previous.values()))
+    return manifest
+
+
+# --- serving ---
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            out[token.strip().lower()] = q
+    return out
+
+
+def accepted_encodings(accept_encoding: str, available) -> List[str]:
+    """Encodings from `available` the client accepts, in preference order."""
+    acc = _accepted(accept_encoding)
+    # brotli first: smaller for text assets
+    return [enc for enc in ("br", "gzip") if enc in available and acc.get(enc, acc.get("*", 0.0)) > 0]
+
+
+def pick_encoding(accept_encoding: str, available) -> Optional[str]:
+    encs = accepted_encodings(accept_encoding, available)
+    return encs[0] if encs else None
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves `<file>.br`/`<file>.gz` when accepted and marks
+    fingerprinted files immutable; unhashed files must revalidate."""
+
+    async def get_response(self, path: str, scope) -> Response:
+        immutable = bool(HASHED_NAME.search(path))
+        encs = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""), _EXT)
+        # variants are optional (no .br without brotli; none for small files): try each in turn
+        for enc in encs if Path(path).suffix in COMPRESSIBLE else ():
+            full, st = await anyio.to_thread.run_sync(self.lookup_path, path + _EXT[enc])
+            if st is not None:
+                resp = self.file_response(full, st, scope)
+                resp.headers["content-type"] = _media_type(path)
+                resp.headers["content-encoding"] = enc
+                resp.headers["vary"] = "Accept-Encoding"
+                resp.headers["cache-control"] = IMMUTABLE if immutable else REVALIDATE
+                return resp
+        resp = await super().get_response(path, scope)
+        if resp.status_code in (200, 304):
+            resp.headers["cache-control"] = IMMUTABLE if immutable else REVALIDATE
+            if Path(path).suffix in COMPRESSIBLE:
+                resp.headers["vary"] = "Accept-Encoding"
+        return resp
+
+
+def _media_type(path: str) -> str:
+    mt = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return f"{mt}; charset=utf-8" if mt.startswith("text/") or mt.endswith("javascript") else mt
+
+
+class IndexCache:
+    """index.html (built copy when present and `use_dist`) held in memory with precompressed
+    variants; reloaded when the file (or the build's manifest) changes on disk."""
+
+    def __init__(self, static_dir: Path = STATIC_DIR, use_dist: bool = True):
+        self.static_dir = static_dir
+        self.use_dist = use_dist
+        self._variants: Optional[Dict[Optional[str], bytes]] = None
+        self._etag = ""
+        self._stamp: tuple = ()
+
+    def _sources(self) -> List[Path]:
+        built = self.static_dir / DIST / "index.html"
+        if self.use_dist and built.exists():
+            return [built, self.static_dir / DIST / "manifest.json"]
+        return [self.static_dir / "index.html"]
+
+    def _load(self) -> bool:
+        sources = self._sources()
+        try:
+            stamp = tuple((str(p), p.stat().st_mtime_ns) for p in sources if p.exists())
+        except OSError:   # replaced between exists() and stat(): next request retries
+            return self._variants is not None
+        if stamp == self._stamp and self._variants is not None:
+            return True
+        if not sources[0].exists():
+            self._variants = None
+            return False
+        data = sources[0].read_bytes()
+        self._variants = {None: data, **_compress_variants(data)}
+        self._etag = '"%s"' % hashlib.sha256(data).hexdigest()[:16]
+        self._stamp = stamp
+        return True
+
+    def response(self, request: Request) -> Optional[Response]:
+        if not self._load():
+            return None
+        headers = {"ETag": self._etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+        if self._etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        enc = pick_encoding(request.headers.get("accept-encoding", ""), self._variants)
+        if enc:
+            headers["Content-Encoding"] = enc
+        return Response(self._variants[enc], media_type="text/html", headers=headers)
+
+
+def main(argv=None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if args[:1] != ["build"]:
+        print("usage: python -m app.assets build [STATIC_DIR]")
+        return 2
+    static_dir = Path(args[1]) if len(args) > 1 else STATIC_DIR
+    manifest = build(static_dir)
+    for src, dst in manifest.items():
+        print(f"{src} -> {DIST}/{dst}")
+    if brotli is None:
+        print("note: `brotli` not installed; wrote gzip variants only")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+# app/batch.py
+"""
+Background runner for /api/batch jobs (see app/routers/batch.py).
+
+A job is a JSONL file of ChatRequests stored as BATCH_DIR/<id>.in.jsonl. As each item
+finishes, its result is appended to BATCH_DIR/<id>.jsonl as one line tagged with the input
+index, so lines can be out of order. The results file records which items are done: a
+resumed job re-runs only the items with no result line. Job rows in the DB hold status and
+counters. Runners claim queued jobs atomically and heartbeat them. A running job whose
+heartbeat goes stale (its process died) is requeued.
+
+Items are low priority. At most BATCH_CONCURRENCY run per model, and an item is dispatched
+only while the model has no interactive stream in flight in any worker (Registry.interactive).
+"""
+from __future__ import annotations
+import asyncio, json, logging, os, socket, time
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, true, update
+
+from .config import settings
+from .db import SessionLocal
+from .llm.base import ChatRequest
+from .llm.registry import registry, ModelEntry
+from .llm.tokenizer import budget_request
+from .metrics import BATCH_ITEMS, LLM_QUEUE_WAIT
+from .models import BatchJob
+
+log = logging.getLogger(__name__)
+
+BASE = Path(settings.BATCH_DIR)  # created when the runner starts
+TERMINAL = ("completed", "failed", "cancelled")
+
+
+def input_path(job_id: str) -> Path:
+    return BASE / f"{job_id}.in.jsonl"
+
+
+def result_path(job_id: str) -> Path:
+    return BASE / f"{job_id}.jsonl"
+
+
+def _completed(path: Path) -> Tuple[Set[int], int]:
+    """Indices that have a result line, and how many of those failed. A torn or corrupt tail
+    (the process died mid-write) is truncated away; those items run again."""
+    done: Set[int] = set()
+    failed = good = 0
+    if not path.exists():
+        return done, failed
+    with path.open("rb+") as f:
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("torn line")
+                rec = json.loads(line)
+            except ValueError:
+                break
+            done.add(rec["index"])
+            failed += rec.get("error") is not None
+            good += len(line)
+        f.truncate(good)
+    return done, failed
+
+
+class BatchRunner:
+    def __init__(self):
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._progress: Dict[str, List[int]] = {}     # job id -> [done, failed]
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+
+    def start(self) -> None:
+        BASE.mkdir(parents=True, exist_ok=True)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._task, *self._jobs.values()) if t]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # hand our jobs back now rather than after BATCH_STALE_SECONDS
+        await asyncio.to_thread(self._release, BatchJob.runner == self.name)
+
+    # --- DB (sync; called via to_thread) ---
+
+    def _release(self, cond) -> None:
+        with SessionLocal() as db:
+            db.execute(update(BatchJob).where(BatchJob.status == "running", cond)
+                       .values(status="queued", runner=None))
+            db.commit()
+
+    def _claim(self) -> List[BatchJob]:
+        now = time.time()
+        claimed = []
+        with SessionLocal() as db:
+            # jobs of a runner that stopped heartbeating (process died) go back to the queue
+            db.execute(update(BatchJob)
+                       .where(BatchJob.status == "running", BatchJob.heartbeat < now - settings.BATCH_STALE_SECONDS)
+                       .values(status="queued", runner=None))
+            for job in db.scalars(select(BatchJob).where(BatchJob.status == "queued").order_by(BatchJob.created_at)):
+                # conditional update: with several workers only one wins each job
+                r = db.execute(update(BatchJob).where(BatchJob.id == job.id, BatchJob.status == "queued")
+                               .values(status="running", runner=self.name, heartbeat=now))
+                if r.rowcount:
+                    claimed.append(job)
+            db.commit()
+        return claimed
+
+    def _beat(self) -> List[str]:
+        """Heartbeat + counters for our jobs; returns those no longer ours to run (cancelled)."""
+        now = time.time()
+        gone = []
+        with SessionLocal() as db:
+            for job_id, (done, failed) in list(self._progress.items()):
+                r = db.execute(update(BatchJob)
+                               .where(BatchJob.id == job_id, BatchJob.runner == self.name, BatchJob.status == "running")
+                               .values(heartbeat=now, done=done, failed=failed))
+                if not r.rowcount:
+                    gone.append(job_id)
+            db.commit()
+        return gone
+
+    def _finish(self, job_id: str, status: Optional[str], error: Optional[str]) -> None:
+        done, failed = self._progress.get(job_id, (None, None))
+        with SessionLocal() as db:
+            if done is not None:
+                db.execute(update(BatchJob).where(BatchJob.id == job_id, BatchJob.runner == self.name)
+                           .values(done=done, failed=failed))
+            if status:
+                db.execute(update(BatchJob)
+                           .where(BatchJob.id == job_id, BatchJob.runner == self.name, BatchJob.status == "running")
+                           .values(status=status, error=error, finished_at=func.now()))
+            db.commit()
+
+    # --- scheduling ---
+
+    async def _loop(self) -> None:
+        if settings.APP_ROLE == "all":
+            # the only runner there is: anything left "running" is from our previous life
+            await asyncio.to_thread(self._release, true())
+        while True:
+            try:
+                for job in await asyncio.to_thread(self._claim):
+                    log.info("batch job %s (%s items, model %s) claimed by %s", job.id, job.total, job.model, self.name)
+                    task = asyncio.create_task(self._run(job))
+                    self._jobs[job.id] = task
+                    task.add_done_callback(lambda _t, job_id=job.id: self._jobs.pop(job_id, None))
+                for job_id in await asyncio.to_thread(self._beat):
+                    if job_id in self._jobs:
+                        log.info("batch job %s cancelled", job_id)
+                        self._jobs[job_id].cancel()
+            except Exception:
+                log.exception("batch runner pass failed")
+            await asyncio.sleep(settings.BATCH_POLL_INTERVAL)
+
+    async def _run(self, job: BatchJob) -> None:
+        status, error = "completed", None
+        try:
+            done, failed = await asyncio.to_thread(_completed, result_path(job.id))
+            self._progress[job.id] = [len(done), failed]
+            with input_path(job.id).open() as src, result_path(job.id).open("a") as out:
+                pending = ((i, line) for i, line in enumerate(src) if i not in done)
+
+                async def worker():
+                    # workers share one iterator; next() never awaits, so each item goes out once
+                    for i, line in pending:
+                        rec = await self._one(job.model, i, json.loads(line))
+                        out.write(json.dumps(rec) + "\n")
+                        out.flush()   # whole lines only, so /results can serve a running job
+                        p = self._progress[job.id]
+                        p[0] += 1
+                        p[1] += rec["error"] is not None
+
+                workers = [asyncio.create_task(worker()) for _ in range(max(1, settings.BATCH_CONCURRENCY))]
+                try:
+                    await asyncio.gather(*workers)
+                finally:
+                    for w in workers:
+                        w.cancel()
+        except asyncio.CancelledError:
+            # stopped or cancelled: keep the counters; status is set by stop()/the cancel endpoint
+            await asyncio.to_thread(self._finish, job.id, None, None)
+            self._progress.pop(job.id, None)
+            raise
+        except Exception as e:
+            log.exception("batch job %s failed", job.id)
+            status, error = "failed", f"{e.__class__.__name__}: {e}"
+        await asyncio.to_thread(self._finish, job.id, status, error)
+        self._progress.pop(job.id, None)
+        log.info("batch job %s %s", job.id, status)
+
+    async def _entry(self, model: str) -> ModelEntry:
+        # resolved per item: a models.yaml reload may have replaced the entry; KeyError if removed
+        while not registry.is_ready(model):
+            registry.entry(model)
+            await asyncio.sleep(settings.BATCH_POLL_INTERVAL)
+        return registry.entry(model)
+
+    async def _one(self, model: str, index: int, item: dict) -> dict:
+        rec = {"index": index, "id": item.get("id"), "model": model, "output": None, "error": None}
+        sem = self._sems.setdefault(model, asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY)))
+        queued = perf_counter()
+        async with sem:
+            entry = await self._entry(model)
+            # interactive first: hold the item while anything else is streaming on this model
+            while await registry.interactive(model) > 0:
+                await asyncio.sleep(0.05)
+                entry = await self._entry(model)
+            t0 = perf_counter()
+            LLM_QUEUE_WAIT.labels(model).observe(t0 - queued)
+            try:
+                req, _ = await budget_request(entry, ChatRequest.model_validate(item), settings.TOKEN_MIN_OUTPUT)
+                async with entry.lease(background=True) as provider:
+                    rec["output"] = "".join([chunk async for chunk in provider.stream_chat(req)])
+            except Exception as e:
+                rec["error"] = f"{e.__class__.__name__}: {e}"
+            rec["latency_s"] = round(perf_counter() - t0, 3)
+        BATCH_ITEMS.labels(model, "error" if rec["error"] else "ok").inc()
+        return rec
+
+
+runner = BatchRunner()
@@ -0,0 +1,92 @@
+# app/bench/__main__.py
+"""
+Benchmark harness for the generate path.
+
+    # 1) mock upstream on :8080 (what models.yaml's scout17b points at), 40 tok/s, 150 ms TTFT
+    python -m app.bench mock --port 8080 --tokens-per-sec 40 --ttft-ms 150
+
+    # 2) drive the app's /api/generate, then the mock directly, and compare (= proxy overhead)
+    python -m app.bench run --url http://127.0.0.1:8000 -n 200 -c 16 --prompt-len uniform:16-512
+    python -m app.bench run --mode openai --url http://127.0.0.1:8080 -n 200 -c 16
+
+    # 3) app startup: -X importtime breakdown + time-to-first-200 on /healthz, checked against a baseline
+    python -m app.bench startup --baseline bench/startup.json
+"""
+from __future__ import annotations
+import argparse, asyncio, json, sys
+from .loadgen import LoadConfig, LoadGenerator, format_report
+
+
+def _headers(values):
+    out = {}
+    for h in values or []:
+        k, _, v = h.partition(":")
+        out[k.strip()] = v.strip()
+    return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.bench", description="Load generation and latency benchmarks.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    run = sub.add_parser("run", help="drive /api/generate (or an OpenAI endpoint) and report latency")
+    run.add_argument("--url", default="http://127.0.0.1:8000")
+    run.add_argument("--mode", choices=["generate", "openai"], default="generate",
+                     help="generate = app /api/generate; openai = upstream /v1/chat/completions")
+    run.add_argument("--model", default=None)
+    run.add_argument("-n", "--requests", type=int, default=100)
+    run.add_argument("-c", "--concurrency", type=int, default=8, help="in-flight requests for the closed loop (open-loop arrivals are not capped)")
+    run.add_argument("--arrival", default="closed", help="closed | poisson:RATE | burst:SIZE,INTERVAL")
+    run.add_argument("--prompt-len", default="fixed:64",
+                     help="words: fixed:N | uniform:LO-HI | normal:MEAN,STD | lognormal:MEDIAN,SIGMA")
+    run.add_argument("--max-tokens", type=int, default=128)
+    run.add_argument("--timeout", type=float, default=300.0)
+    run.add_argument("-H", "--header", action="append", help="extra header, e.g. 'Cookie: access_token=...'")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--json", dest="json_out", default=None, help="also write the full report here ('-' = stdout)")
+
+    mock = sub.add_parser("mock", help="serve an OpenAI-compatible streaming mock")
+    mock.add_argument("--host", default="127.0.0.1")
+    mock.add_argument("--port", type=int, default=8080)
+    mock.add_argument("--tokens-per-sec", type=float, default=50.0, help="0 = as fast as possible")
+    mock.add_argument("--ttft-ms", type=float, default=100.0)
+    mock.add_argument("--default-tokens", type=int, default=128, help="used when the request has no max_tokens")
+    mock.add_argument("--model", default="mock")
+
+    st = sub.add_parser("startup", help="import-time breakdown and time-to-first-200 on /healthz")
+    st.add_argument("--runs", type=int, default=5)
+    st.add_argument("--save", default=None, help="write the report (JSON) here, e.g. to refresh the baseline")
+    st.add_argument("--baseline", default=None, help="fail (exit 1) if slower than this saved report")
+    st.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs baseline (fraction)")
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "startup":
+        from .startup import main_startup
+        return main_startup(args.runs, args.save, args.baseline, args.tolerance)
+
+    if args.cmd == "mock":
+        from .mock_server import serve
+        serve(args.host, args.port, tokens_per_sec=args.tokens_per_sec, ttft_ms=args.ttft_ms,
+              default_tokens=args.default_tokens, model=args.model)
+        return 0
+
+    cfg = LoadConfig(
+        url=args.url, mode=args.mode, model=args.model, requests=args.requests,
+        concurrency=args.concurrency, arrival=args.arrival, prompt_len=args.prompt_len,
+        max_tokens=args.max_tokens, timeout=args.timeout, headers=_headers(args.header), seed=args.seed,
+    )
+    report = asyncio.run(LoadGenerator(cfg).run())
+    if args.json_out == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(report))
+        if args.json_out:
+            with open(args.json_out, "w") as f:
+                json.dump(report, f, indent=2)
+    return 0 if report["succeeded"] == report["requests"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
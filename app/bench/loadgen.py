@@ -0,0 +1,267 @@
+# app/bench/loadgen.py
+from __future__ import annotations
+import asyncio, json, math, random, time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import httpx
+
+FILLER = ("the quick brown fox jumps over the lazy dog while benchmarks measure "
+          "latency throughput and tail behaviour under load").split()
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Linear-interpolated percentile (p in 0..100); None for an empty sample."""
+    if not values:
+        return None
+    s = sorted(values)
+    k = (len(s) - 1) * p / 100.0
+    lo, hi = math.floor(k), math.ceil(k)
+    return s[lo] + (s[hi] - s[lo]) * (k - lo)
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+class PromptLengths:
+    """Prompt length sampler (in words): fixed:N, uniform:LO-HI, normal:MEAN,STD, lognormal:MEDIAN,SIGMA."""
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.kind, _, arg = spec.partition(":")
+        self.rng = rng
+        if self.kind == "fixed":
+            self.n = int(arg or 64)
+        elif self.kind == "uniform":
+            lo, hi = (arg or "16-256").split("-")
+            self.lo, self.hi = int(lo), int(hi)
+        elif self.kind in ("normal", "lognormal"):
+            a, b = (arg or "128,32").split(",")
+            self.a, self.b = float(a), float(b)
+        else:
+            raise ValueError(f"Unknown prompt length distribution: {spec}")
+
+    def sample(self) -> int:
+        if self.kind == "fixed":
+            n = self.n
+        elif self.kind == "uniform":
+            n = self.rng.randint(self.lo, self.hi)
+        elif self.kind == "normal":
+            n = round(self.rng.gauss(self.a, self.b))
+        else:
+            n = round(self.rng.lognormvariate(math.log(self.a), self.b))
+        return max(1, n)
+
+    def prompt(self) -> str:
+        n = self.sample()
+        return " ".join(FILLER[i % len(FILLER)] for i in range(n))
+
+
+def count_words(carry: str, chunk: str) -> tuple[int, str]:
+    """Words completed by `chunk`, and the unfinished trailing word to carry into the next read."""
+    text = carry + chunk
+    parts = text.split()
+    if parts and not text[-1].isspace():
+        return len(parts) - 1, parts[-1]
+    return len(parts), ""
+
+
+@dataclass
+class Sample:
+    ok: bool
+    prompt_words: int
+    start: float                    # scheduled arrival (open loop) or dispatch (closed loop)
+    ttft: Optional[float] = None
+    end: Optional[float] = None
+    tokens: int = 0
+    gaps: List[float] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadConfig:
+    url: str = "http://127.0.0.1:8000"
+    mode: str = "generate"          # generate = /api/generate (app); openai = upstream /v1/chat/completions
+    model: Optional[str] = None
+    requests: int = 100
+    concurrency: int = 8
+    arrival: str = "closed"         # closed | poisson:RATE | burst:SIZE,INTERVAL
+    prompt_len: str = "fixed:64"
+    max_tokens: int = 128
+    timeout: float = 300.0
+    headers: Dict[str, str] = field(default_factory=dict)
+    seed: int = 0
+
+
+class LoadGenerator:
+    def __init__(self, cfg: LoadConfig):
+        self.cfg = cfg
+        self.rng = random.Random(cfg.seed)
+        self.lengths = PromptLengths(cfg.prompt_len, self.rng)
+        self.samples: List[Sample] = []
+
+    def _request(self, prompt: str) -> tuple[str, Dict[str, Any], Dict[str, Any]]:
+        cfg = self.cfg
+        base = cfg.url.rstrip("/")
+        if cfg.mode == "openai":
+            body = {"model": cfg.model or "mock", "stream": True, "max_tokens": cfg.max_tokens,
+                    "messages": [{"role": "user", "content": prompt}]}
+            return f"{base}/v1/chat/completions", {}, body
+        params = {"model": cfg.model} if cfg.model else {}
+        body = {"prompt": prompt, "llm_params": {"max_tokens": cfg.max_tokens}}
+        return f"{base}/api/generate", params, body
+
+    async def _one(self, client: httpx.AsyncClient, start: float) -> None:
+        prompt = self.lengths.prompt()
+        url, params, body = self._request(prompt)
+        # `start` is when the request was due: time spent waiting for a connection counts
+        s = Sample(ok=False, prompt_words=len(prompt.split()), start=start)
+        self.samples.append(s)
+        last = None
+        carry = ""
+        try:
+            async with client.stream("POST", url, params=params, json=body) as resp:
+                if resp.status_code != 200:
+                    s.error = f"HTTP {resp.status_code}"
+                    await resp.aread()
+                    return
+                # openai: one SSE event per token. generate: plain text whose reads merge
+                # tokens under load, so tokens are counted as words (exact against the bundled
+                # mock, which emits one word per token) and a read's gap is spread over its tokens
+                chunks = resp.aiter_lines() if self.cfg.mode == "openai" else resp.aiter_text()
+                async for chunk in chunks:
+                    if self.cfg.mode == "openai":
+                        if not self._is_delta(chunk):
+                            continue
+                        n = 1
+                    else:
+                        n, carry = count_words(carry, chunk)
+                        if not n:
+                            continue
+                    now = time.perf_counter()
+                    if last is None:
+                        s.ttft = now - s.start
+                    else:
+                        s.gaps.extend([(now - last) / n] * n)
+                    last = now
+                    s.tokens += n
+            if carry:
+                s.tokens += 1   # last word has no trailing space
+            s.ok = True
+        except Exception as e:
+            s.error = f"{e.__class__.__name__}: {e}"
+        finally:
+            s.end = time.perf_counter()
+
+    @staticmethod
+    def _is_delta(line: str) -> bool:
+        if not line.startswith("data:"):
+            return False
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return False
+        try:
+            obj = json.loads(data)
+        except ValueError:
+            return False
+        return any(((c or {}).get("delta") or {}).get("content") for c in obj.get("choices", []))
+
+    @property
+    def open_loop(self) -> bool:
+        return self.cfg.arrival.partition(":")[0] != "closed"
+
+    async def _arrivals(self, t0: float):
+        """Yield each request's scheduled start per the arrival pattern (closed loop: immediately).
+        The schedule is absolute, so a late wakeup doesn't push later arrivals back."""
+        kind, _, arg = self.cfg.arrival.partition(":")
+        due = t0
+        for i in range(self.cfg.requests):
+            if kind == "poisson":
+                due += self.rng.expovariate(float(arg or 1.0))
+            elif kind == "burst":
+                size, interval = (arg or "8,1").split(",")
+                if i and i % int(size) == 0:
+                    due += float(interval)
+            elif kind != "closed":
+                raise ValueError(f"Unknown arrival pattern: {self.cfg.arrival}")
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield due
+
+    async def run(self) -> Dict[str, Any]:
+        cfg = self.cfg
+        # closed loop: `concurrency` users, each sending when its last request finishes.
+        # open loop: requests go out on schedule however many are in flight; capping them
+        # would turn it back into a closed loop and hide queueing (coordinated omission)
+        sem = None if self.open_loop else asyncio.Semaphore(cfg.concurrency)
+        limits = httpx.Limits(max_connections=None if self.open_loop else cfg.concurrency,
+                              max_keepalive_connections=cfg.concurrency)
+
+        async with httpx.AsyncClient(timeout=cfg.timeout, limits=limits, headers=cfg.headers) as client:
+            async def guarded(start: float):
+                try:
+                    await self._one(client, start)
+                finally:
+                    if sem:
+                        sem.release()
+
+            tasks = []
+            t0 = time.perf_counter()
+            async for due in self._arrivals(t0):
+                if sem:
+                    await sem.acquire()
+                    due = time.perf_counter()
+                tasks.append(asyncio.create_task(guarded(due)))
+            await asyncio.gather(*tasks)
+            wall = time.perf_counter() - t0
+        return self.report(wall)
+
+    def report(self, wall: float) -> Dict[str, Any]:
+        ok = [s for s in self.samples if s.ok]
+        tokens = sum(s.tokens for s in ok)
+        per_req_tps = [
+            (s.tokens - 1) / (s.end - s.start - s.ttft)
+            for s in ok if s.ttft is not None and s.tokens > 1 and s.end - s.start > s.ttft
+        ]
+        errors: Dict[str, int] = {}
+        for s in self.samples:
+            if not s.ok:
+                errors[s.error or "unknown"] = errors.get(s.error or "unknown", 0) + 1
+        return {
+            "config": {k: v for k, v in vars(self.cfg).items() if k != "headers"},
+            "requests": len(self.samples),
+            "succeeded": len(ok),
+            "errors": errors,
+            "wall_seconds": wall,
+            "tokens_total": tokens,
+            "throughput_tokens_per_sec": tokens / wall if wall > 0 else None,
+            "requests_per_sec": len(ok) / wall if wall > 0 else None,
+            "ttft_seconds": summarize([s.ttft for s in ok if s.ttft is not None]),
+            "inter_token_seconds": summarize([g for s in ok for g in s.gaps]),
+            "e2e_seconds": summarize([s.end - s.start for s in ok]),
+            "decode_tokens_per_sec": summarize(per_req_tps),
+        }
+
+
+def format_report(r: Dict[str, Any]) -> str:
+    def ms(v): return "-" if v is None else f"{v * 1000:9.1f}"
+    def num(v): return "-" if v is None else f"{v:9.1f}"
+
+    lines = [
+        f"requests   {r['succeeded']}/{r['requests']} ok in {r['wall_seconds']:.2f}s"
+        f"  ({num(r['requests_per_sec']).strip()} req/s, {num(r['throughput_tokens_per_sec']).strip()} tok/s)",
+        f"{'':22}{'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}",
+    ]
+    for label, key, fmt in (("TTFT (ms)", "ttft_seconds", ms), ("inter-token (ms)", "inter_token_seconds", ms),
+                            ("end-to-end (ms)", "e2e_seconds", ms), ("decode tok/s", "decode_tokens_per_sec", num)):
+        st = r[key]
+        lines.append(f"{label:22}" + " ".join(fmt(st[k]) for k in ("mean", "p50", "p95", "p99", "max")))
+    for err, n in r["errors"].items():
+        lines.append(f"error x{n}: {err}")
+    return "\n".join(lines)
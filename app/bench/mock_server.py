@@ -0,0 +1,61 @@
+# app/bench/mock_server.py
+"""OpenAI-compatible streaming mock with a tunable token rate, so the proxy path
+(/api/generate -> OpenAIProvider -> upstream) can be benchmarked without a model."""
+from __future__ import annotations
+import asyncio, json, time, uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua").split()
+
+
+def create_app(tokens_per_sec: float = 50.0, ttft_ms: float = 100.0, default_tokens: int = 128,
+               model: str = "mock") -> FastAPI:
+    app = FastAPI(title="mock-openai")
+
+    @app.get("/v1/models")
+    def models():
+        return {"object": "list", "data": [{"id": model, "object": "model"}]}
+
+    @app.post("/tokenize")
+    async def tokenize(request: Request):
+        # llama-server's endpoint; one token per whitespace-separated word is close enough here
+        body = await request.json()
+        return {"tokens": list(range(len(str(body.get("content", "")).split())))}
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        n = int(body.get("max_tokens") or default_tokens)
+        gap = 1.0 / tokens_per_sec if tokens_per_sec > 0 else 0.0
+        cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        async def stream():
+            await asyncio.sleep(ttft_ms / 1000.0)
+            start = time.perf_counter()
+            for i in range(n):
+                # pace against the absolute schedule so sleep jitter doesn't accumulate
+                delay = start + i * gap - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                chunk = {"id": cid, "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": WORDS[i % len(WORDS)] + " "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            # llama-server reports decode timings on the final chunk
+            done = {"id": cid, "object": "chat.completion.chunk", "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "length"}],
+                    "timings": {"predicted_n": n, "predicted_ms": elapsed_ms,
+                                "predicted_per_second": n / (elapsed_ms / 1000) if elapsed_ms else 0.0}}
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def serve(host: str, port: int, **kw) -> None:
+    import uvicorn
+    uvicorn.run(create_app(**kw), host=host, port=port, log_level="warning")
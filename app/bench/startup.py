@@ -0,0 +1,107 @@
+# app/bench/startup.py
+from __future__ import annotations
+import json, os, socket, statistics, subprocess, sys, time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+
+def import_breakdown(module: str = "app.main", top: int = 15) -> Dict[str, Any]:
+    """Run `python -X importtime -c 'import <module>'` in a fresh interpreter and aggregate
+    self time per top-level package."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True)
+    per_pkg: Dict[str, int] = defaultdict(int)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cum_us, name = [x.strip() for x in line[len("import time:"):].split("|")]
+            self_us, cum_us = int(self_us), int(cum_us)
+        except ValueError:
+            continue  # header row
+        per_pkg[name.split(".")[0]] += self_us
+        if name == module:
+            total_us = cum_us
+    ranked = sorted(per_pkg.items(), key=lambda kv: -kv[1])[:top]
+    return {"module": module, "total_ms": total_us / 1000, "packages_ms": {k: v / 1000 for k, v in ranked}}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_200(app: str = "app.main:app", path: str = "/healthz", timeout: float = 60.0) -> float:
+    """Seconds from spawning uvicorn to the first 200 on `path`."""
+    import httpx
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - t0 < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}{path}").status_code == 200:
+                        return time.perf_counter() - t0
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise TimeoutError(f"no 200 from {path} within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def run(runs: int = 5, module: str = "app.main", app: str = "app.main:app") -> Dict[str, Any]:
+    imports = [import_breakdown(module) for _ in range(runs)]
+    first_200 = [time_to_first_200(app) for _ in range(runs)]
+    return {
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "import_ms": statistics.median(i["total_ms"] for i in imports),
+        # breakdown from the median run
+        "import_breakdown_ms": sorted(imports, key=lambda i: i["total_ms"])[len(imports) // 2]["packages_ms"],
+        "first_200_ms": statistics.median(first_200) * 1000,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions beyond `tolerance` (fraction) against a saved report."""
+    out = []
+    for key in ("import_ms", "first_200_ms"):
+        base, cur = baseline.get(key), report.get(key)
+        if base and cur and cur > base * (1 + tolerance):
+            out.append(f"{key}: {cur:.0f} ms vs baseline {base:.0f} ms (+{(cur / base - 1) * 100:.0f}%)")
+    return out
+
+
+def format_report(r: Dict[str, Any]) -> str:
+    lines = [f"import app.main   {r['import_ms']:8.1f} ms (median of {r['runs']})",
+             f"first 200 /healthz {r['first_200_ms']:7.1f} ms",
+             "self time by package:"]
+    lines += [f"  {pkg:28} {ms:8.1f} ms" for pkg, ms in r["import_breakdown_ms"].items()]
+    return "\n".join(lines)
+
+
+def main_startup(runs: int, save: Optional[str], baseline: Optional[str], tolerance: float) -> int:
+    # run from the repo root so models.yaml / .env resolve like in production
+    report = run(runs)
+    print(format_report(report))
+    if save:
+        with open(save, "w") as f:
+            json.dump(report, f, indent=2)
+    if baseline and os.path.exists(baseline):
+        with open(baseline) as f:
+            regressions = compare(report, json.load(f), tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        return 1 if regressions else 0
+    return 0
@@ -23,6 +23,9 @@ class Settings(BaseSettings):
     JWT_ALGO: str = "HS256"
     ACCESS_TOKEN_DAYS: int = 14
 
+    # accounts allowed to use /admin/* (runtime telemetry, restarts); empty = nobody
+    ADMIN_EMAILS: List[str] = Field(default_factory=list)
+
     # password reset token validity (minutes)
     RESET_TOKEN_MINUTES: int = 30
 
@@ -32,6 +35,44 @@ class Settings(BaseSettings):
     LLAMA_API_KEY: str = ""  # if llama-server requires it; else leave blank
     LLAMA_TIMEOUT: float = 60.0
 
+    # per-host llama.cpp thread/affinity tuning results (<dir>/<hostname>.json)
+    RUNTIME_TUNING_DIR: str = "tuning"
+
+    # /api/generate context budgeting: max_tokens is trimmed so prompt + reply fit the model's
+    # context; requests leaving fewer than this many reply tokens are rejected (413)
+    TOKEN_MIN_OUTPUT: int = 16
+
+    # models.yaml hot reload: mtime poll interval (0 = only via POST /admin/models/reload),
+    # and how long replaced/removed models may finish in-flight streams before being stopped
+    MODELS_RELOAD_INTERVAL: float = 2.0
+    MODELS_DRAIN_TIMEOUT: float = 300.0
+
+    # process role: "all" = single process (dev, `uvicorn --reload`); under `python -m app.serve`
+    # one "owner" process runs llama.cpp runtimes + upload sweeper and N "worker"s serve HTTP
+    APP_ROLE: str = "all"
+    # cross-process state (login throttle, runtime status, owner commands); SQLite/WAL file
+    SHARED_STATE_DB: str = "shared_state.db"
+
+    # /api/batch: JSONL inputs/results live in BATCH_DIR; items run at most
+    # BATCH_CONCURRENCY per model and only while no interactive stream is in flight on it
+    BATCH_DIR: str = "batch"
+    BATCH_MAX_MB: int = 100
+    BATCH_CONCURRENCY: int = 2
+    BATCH_POLL_INTERVAL: float = 2.0      # queued-job poll + running-job heartbeat
+    BATCH_STALE_SECONDS: float = 30.0     # running job without a heartbeat this long is requeued
+
+    # /api/ws multiplexed generation: concurrent streams per connection, and bytes of delta
+    # frames the client may leave unacknowledged before generation pauses (flow control)
+    WS_MAX_STREAMS: int = 8
+    WS_WINDOW_BYTES: int = 256 * 1024
+
+    # serve the `python -m app.assets build` output in static/dist/; run.sh turns this off for
+    # `uvicorn --reload`, so edits to static/ show up on refresh without a rebuild
+    STATIC_DIST: bool = True
+
+    # OpenTelemetry spans (needs opentelemetry-api; exporter configured by the deployment)
+    OTEL_ENABLED: bool = False
+
     def parse_origins(self, v):
         if isinstance(v, list): return v
         try: return json.loads(v)
@@ -1,17 +1,33 @@
 # app/db.py
 
-from sqlalchemy import create_engine
+from time import perf_counter
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from .config import settings
+from .metrics import DB_QUERY, DB_SESSION
 
 engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {})
 SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+@event.listens_for(engine, "before_cursor_execute")
+def _query_start(conn, cursor, statement, parameters, context, executemany):
+    # on the execution context, not conn.info: a failed statement never reaches after_cursor_execute
+    if context is not None:
+        context._query_t0 = perf_counter()
+
+@event.listens_for(engine, "after_cursor_execute")
+def _query_end(conn, cursor, statement, parameters, context, executemany):
+    t0 = getattr(context, "_query_t0", None)
+    if t0 is not None:
+        DB_QUERY.observe(perf_counter() - t0)
+
 def get_db():
     db = SessionLocal()
+    t0 = perf_counter()
     try:
         yield db
     finally:
         db.close()
+        DB_SESSION.observe(perf_counter() - t0)
@@ -0,0 +1,280 @@
+# app/download.py
+"""
+Parallel, resumable, checksum-verified model downloader.
+
+    python -m app.download openai/gpt-oss-20b ./models/gpt-oss-20b
+    python -m app.download unsloth/Llama-4-Scout-17B-16E-Instruct-GGUF ./models/llama \\
+        --include "*UD-Q4_K_XL*" --workers 4
+    python -m app.download openai/gpt-oss-20b ./models/gpt-oss-20b --mirror /srv/hf-mirror   # offline
+
+Partial files are kept as `<name>.part` and resumed with HTTP Range requests. LFS files
+are checked against the SHA256 in the repo metadata, small files against their git blob SHA1.
+A mirror is a directory laid out as `<mirror>/<repo_id>/<path>`; an optional
+`<mirror>/<repo_id>/.manifest.json` ([{"path", "size", "sha256"}]) supplies checksums.
+"""
+from __future__ import annotations
+import argparse, fnmatch, hashlib, json, logging, os, sys, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+
+log = logging.getLogger("download")
+
+CHUNK = 1024 * 1024
+
+
+class ChecksumError(Exception):
+    pass
+
+
+@dataclass
+class RemoteFile:
+    path: str
+    size: Optional[int] = None
+    sha256: Optional[str] = None     # LFS objects
+    git_sha1: Optional[str] = None   # regular git blobs
+
+
+@dataclass
+class Result:
+    path: str
+    status: str                      # downloaded | resumed | skipped | failed
+    bytes: int = 0
+    resumed_from: int = 0
+    error: Optional[str] = None
+
+
+# --- sources ---
+
+class HubSource:
+    def __init__(self, repo_id: str, revision: Optional[str] = None, token: Optional[str] = None):
+        import httpx
+        from huggingface_hub import get_token
+        self.repo_id = repo_id
+        self.revision = revision
+        token = token or get_token()
+        self._headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self._client = httpx.Client(follow_redirects=True, timeout=httpx.Timeout(30.0, read=120.0),
+                                    headers=self._headers)
+
+    def list(self) -> List[RemoteFile]:
+        from huggingface_hub import HfApi
+        info = HfApi().model_info(self.repo_id, revision=self.revision, files_metadata=True)
+        out = []
+        for s in info.siblings or []:
+            lfs = getattr(s, "lfs", None)
+            out.append(RemoteFile(
+                path=s.rfilename,
+                size=getattr(s, "size", None),
+                sha256=(lfs.sha256 if lfs else None),
+                git_sha1=(None if lfs else getattr(s, "blob_id", None)),
+            ))
+        return out
+
+    def read(self, f: RemoteFile, start: int) -> Iterator[bytes]:
+        from huggingface_hub import hf_hub_url
+        url = hf_hub_url(self.repo_id, f.path, revision=self.revision)
+        headers = {"Range": f"bytes={start}-"} if start else {}
+        with self._client.stream("GET", url, headers=headers) as r:
+            if start and r.status_code != 206:
+                raise IOError(f"server ignored Range request (HTTP {r.status_code})")
+            r.raise_for_status()
+            yield from r.iter_bytes(CHUNK)
+
+
+class MirrorSource:
+    def __init__(self, mirror: str, repo_id: str):
+        self.root = Path(mirror) / repo_id
+        if not self.root.is_dir():
+            raise FileNotFoundError(f"Mirror has no copy of {repo_id}: {self.root}")
+
+    def list(self) -> List[RemoteFile]:
+        manifest = self.root / ".manifest.json"
+        if manifest.exists():
+            return [RemoteFile(path=e["path"], size=e.get("size"), sha256=e.get("sha256"))
+                    for e in json.loads(manifest.read_text())]
+        return [RemoteFile(path=p.relative_to(self.root).as_posix(), size=p.stat().st_size)
+                for p in sorted(self.root.rglob("*")) if p.is_file() and p.name != ".manifest.json"]
+
+    def read(self, f: RemoteFile, start: int) -> Iterator[bytes]:
+        with (self.root / f.path).open("rb") as src:
+            src.seek(start)
+            while chunk := src.read(CHUNK):
+                yield chunk
+
+
+# --- selection / verification ---
+
+def select(files: Sequence[RemoteFile], include: Sequence[str] = (), exclude: Sequence[str] = ()) -> List[RemoteFile]:
+    def hit(path, pats):
+        return any(fnmatch.fnmatch(path, p) or fnmatch.fnmatch(Path(path).name, p) for p in pats)
+    return [f for f in files if (not include or hit(f.path, include)) and not hit(f.path, exclude)]
+
+
+def _hasher(f: RemoteFile):
+    if f.sha256:
+        return hashlib.sha256()
+    if f.git_sha1 and f.size is not None:
+        h = hashlib.sha1()
+        h.update(b"blob %d\0" % f.size)
+        return h
+    return None
+
+
+def _check(f: RemoteFile, h, size: int) -> None:
+    if f.size is not None and size != f.size:
+        raise ChecksumError(f"{f.path}: size {size} != expected {f.size}")
+    if h is not None:
+        want = f.sha256 or f.git_sha1
+        if h.hexdigest() != want:
+            raise ChecksumError(f"{f.path}: checksum {h.hexdigest()} != expected {want}")
+
+
+def verify_file(f: RemoteFile, path: Path) -> None:
+    h = _hasher(f)
+    size = 0
+    with path.open("rb") as fh:
+        while chunk := fh.read(CHUNK):
+            size += len(chunk)
+            if h is not None:
+                h.update(chunk)
+    _check(f, h, size)
+
+
+# --- download ---
+
+class Downloader:
+    def __init__(self, source, local_dir: str, workers: int = 4, verify: bool = True, progress=None):
+        self.source = source
+        self.local_dir = Path(local_dir)
+        self.workers = max(1, workers)
+        self.verify = verify
+        self.progress = progress          # callable(nbytes) for aggregate progress bars
+        self._lock = threading.Lock()
+
+    def _tick(self, n: int) -> None:
+        if self.progress:
+            with self._lock:
+                self.progress(n)
+
+    def fetch(self, f: RemoteFile) -> Result:
+        dest = self.local_dir / f.path
+        part = dest.with_name(dest.name + ".part")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        if dest.exists():
+            try:
+                if self.verify:
+                    verify_file(f, dest)
+                elif f.size is not None and dest.stat().st_size != f.size:
+                    raise ChecksumError("size mismatch")
+                self._tick(dest.stat().st_size)
+                return Result(f.path, "skipped", dest.stat().st_size)
+            except ChecksumError:
+                log.warning("re-downloading %s: existing copy does not verify", f.path)
+                dest.unlink()
+
+        start = part.stat().st_size if part.exists() else 0
+        if f.size is not None and start > f.size:
+            part.unlink()
+            start = 0
+        h = _hasher(f) if self.verify else None
+        if start and h is not None:
+            # hash what we already have so verification stays a single pass
+            with part.open("rb") as fh:
+                while chunk := fh.read(CHUNK):
+                    h.update(chunk)
+        self._tick(start)
+
+        size = start
+        with part.open("ab") as out:
+            # a complete .part (interrupted before the rename) needs no request at all
+            chunks = () if f.size is not None and start == f.size else self.source.read(f, start)
+            for chunk in chunks:
+                out.write(chunk)
+                if h is not None:
+                    h.update(chunk)
+                size += len(chunk)
+                self._tick(len(chunk))
+        if self.verify:
+            try:
+                _check(f, h, size)
+            except ChecksumError:
+                part.unlink(missing_ok=True)  # corrupt: don't resume from it next time
+                raise
+        os.replace(part, dest)
+        return Result(f.path, "resumed" if start else "downloaded", size - start, resumed_from=start)
+
+    def run(self, files: Sequence[RemoteFile]) -> List[Result]:
+        results: List[Result] = []
+        # largest first so big shards don't start last and dominate the tail
+        order = sorted(files, key=lambda f: -(f.size or 0))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.fetch, f): f for f in order}
+            for fut in as_completed(futures):
+                f = futures[fut]
+                try:
+                    results.append(fut.result())
+                except Exception as e:
+                    log.error("failed %s: %s", f.path, e)
+                    results.append(Result(f.path, "failed", error=f"{e.__class__.__name__}: {e}"))
+        return results
+
+
+def download(repo_id: str, local_dir: str, include: Sequence[str] = (), exclude: Sequence[str] = (),
+             workers: int = 4, mirror: Optional[str] = None, revision: Optional[str] = None,
+             verify: bool = True, show_progress: bool = True) -> List[Result]:
+    source = MirrorSource(mirror, repo_id) if mirror else HubSource(repo_id, revision=revision)
+    files = select(source.list(), include, exclude)
+    if not files:
+        raise FileNotFoundError(f"No files in {repo_id} match {list(include) or '*'}")
+    total = sum(f.size or 0 for f in files) or None
+
+    bar = None
+    if show_progress:
+        from tqdm import tqdm
+        bar = tqdm(total=total, unit="B", unit_scale=True, unit_divisor=1024, desc=f"📦 {repo_id}")
+    try:
+        results = Downloader(source, local_dir, workers=workers, verify=verify,
+                             progress=bar.update if bar else None).run(files)
+    finally:
+        if bar:
+            bar.close()
+    for r in results:
+        log.info("%s %s (%d bytes%s)", r.status, r.path, r.bytes,
+                 f", resumed from {r.resumed_from}" if r.resumed_from else "")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.download", description="Download a Hugging Face model repo.")
+    parser.add_argument("repo_id")
+    parser.add_argument("local_dir")
+    parser.add_argument("--include", action="append", default=[], help="glob; repeatable (e.g. '*Q4_K_M*')")
+    parser.add_argument("--exclude", action="append", default=[], help="glob; repeatable")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent file downloads")
+    parser.add_argument("--mirror", default=None, help="read from <mirror>/<repo_id>/ instead of the Hub")
+    parser.add_argument("--revision", default=None)
+    parser.add_argument("--no-verify", action="store_true", help="skip SHA256 / size verification")
+    args = parser.parse_args(argv)
+
+    os.makedirs("logs", exist_ok=True)
+    logging.basicConfig(filename="logs/download.log", level=logging.INFO,
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+
+    print(f"📥 Downloading {args.repo_id} to {args.local_dir}")
+    results = download(args.repo_id, args.local_dir, include=args.include, exclude=args.exclude,
+                       workers=args.workers, mirror=args.mirror, revision=args.revision,
+                       verify=not args.no_verify)
+    failed = [r for r in results if r.status == "failed"]
+    counts = {s: sum(r.status == s for r in results) for s in ("downloaded", "resumed", "skipped")}
+    print(f"{'❌' if failed else '✅'} {counts['downloaded']} downloaded, {counts['resumed']} resumed, "
+          f"{counts['skipped']} already present, {len(failed)} failed")
+    for r in failed:
+        print(f"   {r.path}: {r.error}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
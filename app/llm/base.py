@@ -12,6 +12,11 @@ class BaseProvider:
     name: str
     display_name: str
 
+    @property
+    def ready(self) -> bool:
+        """False while the provider is still loading (e.g. an in-process model)."""
+        return True
+
     async def startup(self) -> None:
         """Optional: start processes or warmups."""
         return None
@@ -1,8 +1,22 @@
 # app/llm/providers/openai.py
 from __future__ import annotations
 from typing import AsyncIterator, Dict, Any, Optional, List
-import os, json, httpx
+import os, json
 from ..base import BaseProvider, ChatRequest
+from ...metrics import LLM_DECODE_RATE, LLM_DRAFT_TOKENS
+from ...tracing import span, inject
+
+
+def record_timings(model: str, timings: Dict[str, Any]) -> None:
+    """Decode speed and speculative-decoding counts from a llama-server `timings` object."""
+    rate = timings.get("predicted_per_second")
+    if rate:
+        LLM_DECODE_RATE.labels(model).observe(float(rate))
+    drafted = timings.get("draft_n")
+    if drafted:
+        LLM_DRAFT_TOKENS.labels(model, "drafted").inc(drafted)
+        LLM_DRAFT_TOKENS.labels(model, "accepted").inc(timings.get("draft_n_accepted") or 0)
+
 
 class OpenAIProvider(BaseProvider):
     def __init__(self, name: str, display_name: str, base_url: str, api_key: str, model: str, defaults: Dict[str, Any]):
@@ -20,6 +34,7 @@ class OpenAIProvider(BaseProvider):
         return None
 
     async def stream_chat(self, req: ChatRequest) -> AsyncIterator[str]:
+        import httpx  # deferred: keeps app import (and worker spawn) lean
         headers = {"Content-Type": "application/json"}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
@@ -42,24 +57,28 @@ class OpenAIProvider(BaseProvider):
         url = f"{self.base_url}/chat/completions"
         timeout = float(self.defaults.get("timeout", 300))
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            async with client.stream("POST", url, headers=headers, json=payload) as resp:
-                resp.raise_for_status()
-                async for line in resp.aiter_lines():
-                    if not line:
-                        continue
-                    if line.startswith("data:"):
-                        data = line[5:].strip()
-                    else:
-                        data = line.strip()
-                    if data == "[DONE]":
-                        break
-                    try:
-                        obj = json.loads(data)
-                    except Exception:
-                        continue
-                    for choice in obj.get("choices", []):
-                        delta = (choice or {}).get("delta") or {}
-                        content = delta.get("content")
-                        if content:
-                            yield content
+        with span("llm.upstream", {"llm.model": self.model, "http.url": url}):
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                async with client.stream("POST", url, headers=inject(headers), json=payload) as resp:
+                    resp.raise_for_status()
+                    async for line in resp.aiter_lines():
+                        if not line:
+                            continue
+                        if line.startswith("data:"):
+                            data = line[5:].strip()
+                        else:
+                            data = line.strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            obj = json.loads(data)
+                        except Exception:
+                            continue
+                        if obj.get("timings"):
+                            # llama-server: final chunk carries decode/draft timings
+                            record_timings(self.name, obj["timings"])
+                        for choice in obj.get("choices", []):
+                            delta = (choice or {}).get("delta") or {}
+                            content = delta.get("content")
+                            if content:
+                                yield content
@@ -0,0 +1,306 @@
+# app/llm/providers/transformers.py
+"""
+In-process Hugging Face provider. The model lives in a dedicated worker process;
+concurrent stream_chat calls are collected into micro-batches (up to `max_batch_size`
+requests, waiting at most `max_wait_ms` for stragglers) and decoded together with a
+left-padded KV cache. Deltas for every active request travel back as one message per
+decode step over a multiprocessing pipe.
+"""
+from __future__ import annotations
+import asyncio, itertools, multiprocessing as mp, os, queue, threading, time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from ..base import BaseProvider, ChatRequest
+
+# worker -> parent message kinds
+_READY, _DELTAS, _FAILED = "ready", "deltas", "failed"
+# per-request terminal markers inside a _DELTAS message
+_DONE, _ERROR = 0, 1
+
+
+class TransformersProvider(BaseProvider):
+    def __init__(self, name: str, display_name: str, model_path: str, defaults: Dict[str, Any],
+                 device: str = "auto", dtype: str = "auto", max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0, env: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.display_name = display_name
+        self.model_path = model_path
+        self.defaults = defaults or {}
+        self.opts = {
+            "device": device, "dtype": dtype, "max_batch_size": int(max_batch_size),
+            "max_wait_ms": float(max_wait_ms), "env": dict(env or {}),
+        }
+        self.error: Optional[str] = None
+        self._ids = itertools.count(1)
+        self._streams: Dict[int, asyncio.Queue] = {}
+        self._proc: Optional[mp.Process] = None
+        self._req_q = self._resp_q = None
+        self._reader: Optional[threading.Thread] = None
+        self._ready = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def startup(self) -> None:
+        # spawn (not fork): CUDA and tokenizer thread pools don't survive fork
+        ctx = mp.get_context("spawn")
+        self._loop = asyncio.get_running_loop()
+        self._req_q, self._resp_q = ctx.Queue(), ctx.Queue()
+        self._proc = ctx.Process(
+            target=_worker_main, args=(self.model_path, self.opts, self._req_q, self._resp_q),
+            name=f"hf-{self.name}", daemon=True,
+        )
+        self._proc.start()
+        # model loading happens in the background; the registry reports "loading" until ready
+        self._reader = threading.Thread(target=self._read_loop, name=f"hf-{self.name}-reader", daemon=True)
+        self._reader.start()
+
+    async def shutdown(self) -> None:
+        if self._proc is None:
+            return
+        self._req_q.put(("stop",))
+        await asyncio.to_thread(self._proc.join, 10)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            await asyncio.to_thread(self._proc.join, 5)
+        self._resp_q.put(None)  # unblock the reader thread
+        self._proc = None
+        self._ready.clear()
+
+    def _read_loop(self) -> None:
+        proc = self._proc
+        while True:
+            try:
+                msg = self._resp_q.get(timeout=1.0)
+            except queue.Empty:
+                if proc.is_alive():
+                    continue
+                # worker died (OOM, segfault): fail in-flight and future requests instead of hanging
+                msg = (_FAILED, f"transformers worker exited with code {proc.exitcode}")
+                self._loop.call_soon_threadsafe(self._dispatch, msg)
+                return
+            if msg is None:
+                return
+            self._loop.call_soon_threadsafe(self._dispatch, msg)
+            if msg[0] == _FAILED:
+                # the worker reported why it is exiting; its exit code would only mask that
+                return
+
+    def _dispatch(self, msg) -> None:
+        kind = msg[0]
+        if kind == _READY:
+            self._ready.set()
+        elif kind == _FAILED:
+            self.error = msg[1]
+            self._ready.clear()
+            for q in self._streams.values():
+                q.put_nowait((_ERROR, self.error))
+        elif kind == _DELTAS:
+            for rid, item in msg[1]:
+                q = self._streams.get(rid)
+                if q is not None:
+                    q.put_nowait(item)
+
+    async def stream_chat(self, req: ChatRequest) -> AsyncIterator[str]:
+        if not self.ready:
+            raise RuntimeError(self.error or f"Model {self.name} is still loading")
+        params = {**self.defaults, **(req.llm_params or {})}
+        rid = next(self._ids)
+        q: asyncio.Queue = asyncio.Queue()
+        self._streams[rid] = q
+        self._req_q.put(("gen", rid, {
+            "system": req.system, "prompt": req.prompt,
+            "max_tokens": int(params.get("max_tokens", 256)),
+            "temperature": float(params.get("temperature", 1.0)),
+            "top_p": float(params.get("top_p", 1.0)),
+        }))
+        finished = False
+        try:
+            while True:
+                item = await q.get()
+                if isinstance(item, str):
+                    yield item
+                elif item[0] == _DONE:
+                    finished = True
+                    return
+                else:
+                    finished = True
+                    raise RuntimeError(item[1])
+        finally:
+            self._streams.pop(rid, None)
+            if not finished:
+                # client went away: free the batch slot
+                self._req_q.put(("cancel", rid))
+
+
+# ---------------------------------------------------------------- worker process
+
+def _worker_main(model_path: str, opts: Dict[str, Any], req_q, resp_q) -> None:
+    os.environ.update(opts.get("env") or {})
+    try:
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        tok = AutoTokenizer.from_pretrained(model_path)
+        tok.padding_side = "left"
+        if tok.pad_token_id is None:
+            tok.pad_token = tok.eos_token
+        dtype = opts["dtype"]
+        model = AutoModelForCausalLM.from_pretrained(
+            model_path,
+            torch_dtype=getattr(torch, dtype) if dtype != "auto" else "auto",
+            device_map=opts["device"],
+            low_cpu_mem_usage=True,
+        )
+        model.eval()
+    except Exception as e:
+        resp_q.put((_FAILED, f"{e.__class__.__name__}: {e}"))
+        return
+    resp_q.put((_READY,))
+
+    worker = _BatchWorker(model, tok, torch, opts, req_q, resp_q)
+    worker.run()
+
+
+def _eos_ids(model, tok) -> set:
+    ids = getattr(model.generation_config, "eos_token_id", None)
+    ids = ids if isinstance(ids, (list, tuple)) else [ids]
+    return {t for t in [*ids, tok.eos_token_id] if isinstance(t, int)}
+
+
+class _BatchWorker:
+    def __init__(self, model, tok, torch, opts, req_q, resp_q):
+        self.model, self.tok, self.torch = model, tok, torch
+        self.max_batch = opts["max_batch_size"]
+        self.max_wait = opts["max_wait_ms"] / 1000.0
+        self.req_q, self.resp_q = req_q, resp_q
+        self.pending: List[tuple] = []
+        self.cancelled: set = set()
+        self.stopping = False
+
+    def _handle(self, msg) -> None:
+        if msg[0] == "gen":
+            self.pending.append((msg[1], msg[2]))
+        elif msg[0] == "cancel":
+            queued = [p for p in self.pending if p[0] != msg[1]]
+            if len(queued) == len(self.pending):
+                self.cancelled.add(msg[1])  # in flight: dropped at the next decode step
+            self.pending = queued
+        elif msg[0] == "stop":
+            self.stopping = True
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                self._handle(self.req_q.get_nowait())
+            except queue.Empty:
+                return
+
+    def _collect(self) -> List[tuple]:
+        # block for the first request, then give others up to max_wait to join the batch
+        while not self.pending and not self.stopping:
+            self._handle(self.req_q.get())
+        deadline = time.monotonic() + self.max_wait
+        while len(self.pending) < self.max_batch and not self.stopping:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                self._handle(self.req_q.get(timeout=left))
+            except queue.Empty:
+                break
+        batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+        return batch
+
+    def run(self) -> None:
+        while not self.stopping:
+            batch = self._collect()
+            if not batch:
+                continue
+            try:
+                self._decode(batch)
+            except Exception as e:
+                self.resp_q.put((_DELTAS, [(rid, (_ERROR, f"{e.__class__.__name__}: {e}")) for rid, _ in batch]))
+
+    def _render(self, r: Dict[str, Any]) -> str:
+        msgs = ([{"role": "system", "content": r["system"]}] if r.get("system") else []) + \
+               [{"role": "user", "content": r["prompt"]}]
+        if getattr(self.tok, "chat_template", None):
+            return self.tok.apply_chat_template(msgs, tokenize=False, add_generation_prompt=True)
+        return "\n\n".join(m["content"] for m in msgs)
+
+    def _sample(self, logits, temps, top_ps):
+        torch = self.torch
+        greedy = temps <= 0
+        scaled = logits / temps.clamp(min=1e-5).unsqueeze(-1)
+        probs = torch.softmax(scaled, dim=-1)
+        # nucleus filter per row
+        sorted_p, idx = probs.sort(dim=-1, descending=True)
+        drop = sorted_p.cumsum(dim=-1) - sorted_p > top_ps.unsqueeze(-1)
+        sorted_p = sorted_p.masked_fill(drop, 0.0)
+        picked = idx.gather(-1, torch.multinomial(sorted_p, 1)).squeeze(-1)
+        return torch.where(greedy, logits.argmax(dim=-1), picked)
+
+    def _decode(self, batch: List[tuple]) -> None:
+        torch, tok, model = self.torch, self.tok, self.model
+        rids = [rid for rid, _ in batch]
+        reqs = [r for _, r in batch]
+        device = model.device
+        enc = tok([self._render(r) for r in reqs], return_tensors="pt", padding=True,
+                  add_special_tokens=False).to(device)
+        attn = enc.attention_mask
+        cur = enc.input_ids
+        temps = torch.tensor([r["temperature"] for r in reqs], device=device)
+        top_ps = torch.tensor([r["top_p"] for r in reqs], device=device)
+        limits = [r["max_tokens"] for r in reqs]
+        eos = _eos_ids(model, tok)
+        n = len(batch)
+        done = [False] * n
+        ids: List[List[int]] = [[] for _ in range(n)]
+        sent = [""] * n
+        past = None
+
+        with torch.inference_mode():
+            for _ in range(max(limits)):
+                pos = (attn.cumsum(-1) - 1).clamp(min=0)
+                if past is not None:
+                    pos = pos[:, -1:]
+                out = model(input_ids=cur, attention_mask=attn, position_ids=pos,
+                            past_key_values=past, use_cache=True)
+                past = out.past_key_values
+                nxt = self._sample(out.logits[:, -1, :].float(), temps, top_ps)
+
+                self._drain()
+                msgs = []
+                for i, t in enumerate(nxt.tolist()):
+                    if done[i]:
+                        continue
+                    if rids[i] in self.cancelled:
+                        done[i] = True
+                        continue
+                    if t in eos:
+                        done[i] = True
+                        msgs.append((rids[i], (_DONE,)))
+                        continue
+                    ids[i].append(t)
+                    text = tok.decode(ids[i], skip_special_tokens=True)
+                    # hold back incomplete multi-byte sequences until the next token completes them
+                    if not text.endswith("�") and len(text) > len(sent[i]):
+                        msgs.append((rids[i], text[len(sent[i]):]))
+                        sent[i] = text
+                    if len(ids[i]) >= limits[i]:
+                        done[i] = True
+                        msgs.append((rids[i], (_DONE,)))
+                if msgs:
+                    self.resp_q.put((_DELTAS, msgs))
+                if all(done) or self.stopping:
+                    break
+                # finished rows keep decoding pad tokens; their output is ignored
+                cur = torch.where(torch.tensor(done, device=device), tok.pad_token_id, nxt).unsqueeze(-1)
+                attn = torch.cat([attn, attn.new_ones((n, 1))], dim=-1)
+
+        leftovers = [(rids[i], (_DONE,)) for i in range(n) if not done[i]]
+        if leftovers:
+            self.resp_q.put((_DELTAS, leftovers))
+        self.cancelled.difference_update(rids)
@@ -1,11 +1,32 @@
 # app/llm/registry.py
 from __future__ import annotations
-import os, yaml, asyncio
-from typing import Dict, Any
+import os, asyncio, copy, logging, socket
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Any, List, Optional
 from .providers.openai import OpenAIProvider
+from .providers.transformers import TransformersProvider
 from .runtimes.llama_cpp_server import LlamaCppServer
-from dataclasses import dataclass
+from .runtimes.supervisor import RuntimeSupervisor
+from .runtimes.topology import probe_topology
+from .tokenizer import Tokenizer, LlamaServerBackend, HFBackend
+from dataclasses import dataclass, field
 from .base import BaseProvider
+from ..config import settings
+from ..metrics import collect
+from ..shared import store
+
+log = logging.getLogger(__name__)
+
+# provider types that load the model into the serving process; under app.serve every worker
+# would hold its own copy of the weights, so they are refused there
+IN_PROCESS_TYPES = ("transformers",)
+
+# runtime keys that never reach the llama-server process: a reload applies them to the
+# running runtime/supervisor; a change to any other runtime key relaunches the server
+RUNTIME_LIVE_KEYS = ("supervise", "log_max_mb", "log_backups")
+
+# shared-store keys "interactive:<host>:<pid>" -> {model: interactive streams} (workers)
+INTERACTIVE_PREFIX = "interactive:"
 
 @dataclass
 class ModelEntry:
@@ -14,68 +35,531 @@ class ModelEntry:
     type: str
     provider: BaseProvider | None = None
     runtime: object | None = None
+    supervisor: RuntimeSupervisor | None = None
+    spec: Dict[str, Any] = field(default_factory=dict)  # models.yaml entry it was built from
+    tokenizer: Tokenizer | None = None
+    context: int | None = None          # tokens per request (prompt + reply); None = unchecked
+    inflight: int = 0
+    background: int = 0                 # of inflight: batch-job streams (app/batch.py)
+    on_lease: Callable[[], None] | None = field(default=None, repr=False)   # called as a lease starts/ends
+
+    @property
+    def interactive(self) -> int:
+        return self.inflight - self.background
+
+    @asynccontextmanager
+    async def lease(self, background: bool = False):
+        """Pin a stream to this entry: a reload that replaces or removes it waits for the lease."""
+        self.inflight += 1
+        self.background += background
+        if self.on_lease:
+            self.on_lease()
+        try:
+            yield self.provider
+        finally:
+            self.inflight -= 1
+            self.background -= background
+            if self.on_lease:
+                self.on_lease()
+
+    async def drain(self, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.inflight and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+        return self.inflight == 0
 
 
 class Registry:
     def __init__(self):
         self.models: Dict[str, ModelEntry] = {}
         self.defaults: Dict[str, Any] = {}
+        self.path: str = "models.yaml"
+        self._mtime: Optional[float] = None
+        self._reload_lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+        # "all": runtimes + providers here; "owner": runtimes only, publishes their state;
+        # "worker": providers only, runtime state read from the shared store (see app/serve.py)
+        self.role: str = settings.APP_ROLE
+        self._remote: Dict[str, Dict[str, Any]] = {}
+        self._generation = 0
+        self._sync: Optional[asyncio.Task] = None
+        self._leases = asyncio.Event()       # set when a lease starts/ends; wakes _lease_loop
+        self._lease_task: Optional[asyncio.Task] = None
+        self._retiring: set[asyncio.Task] = set()   # drains/stops left running by reload()
 
-    def load(self, path: str = "models.yaml"):
+    @staticmethod
+    def _read(path: str):
+        import yaml
         with open(path, "r") as f:
-            data = yaml.safe_load(f) or {}
-        self.defaults = (data.get("defaults") or {}).get("llm", {})
+            try:
+                data = yaml.safe_load(f) or {}
+            except yaml.YAMLError as e:
+                raise ValueError(f"invalid YAML in {path}: {e}") from e
+        defaults = (data.get("defaults") or {}).get("llm", {})
+        specs: Dict[str, Dict[str, Any]] = {}
         for m in data.get("models", []):
-            name = m["name"]
-            display = m.get("display_name", name)
-            typ = m["type"]
-
-            runtime = None
-            if "runtime" in m:
-                r = m["runtime"]
-                if r.get("kind") == "llama_cpp_server":
-                    runtime = LlamaCppServer(
-                        bin_path=r["bin"],
-                        host=r.get("host","127.0.0.1"),
-                        port=int(r.get("port",8080)),
-                        args=r.get("args", []),
-                    )
+            if m["name"] in specs:
+                raise ValueError(f"Duplicate model name: {m['name']}")
+            specs[m["name"]] = m
+        return defaults, specs
+
+    @classmethod
+    def in_process_models(cls, path: str = "models.yaml") -> List[str]:
+        """Models in `path` that can't be served by app.serve workers (see IN_PROCESS_TYPES)."""
+        _, specs = cls._read(path)
+        return [n for n, m in specs.items() if m["type"] in IN_PROCESS_TYPES]
+
+    def load(self, path: str = "models.yaml"):
+        self.path = path
+        self._mtime = self._stat(path)
+        self.defaults, specs = self._read(path)
+        for name, m in specs.items():
+            self.models[name] = self._build(m, self.defaults)
+        if self.role != "worker":
+            self._place_runtimes()
 
-            if typ == "openai":
-                o = m["openai"]
-                prov = OpenAIProvider(
-                    name=name,
-                    display_name=display,
-                    base_url=os.path.expandvars(o["base_url"]),
-                    api_key=os.path.expandvars(o.get("api_key","")),
-                    model=o["model"],
-                    defaults={**self.defaults, **(m.get("llm") or {})},
+    def _build(self, m: Dict[str, Any], defaults: Dict[str, Any]) -> ModelEntry:
+        name = m["name"]
+        display = m.get("display_name", name)
+        typ = m["type"]
+
+        runtime = supervisor = None
+        if "runtime" in m:
+            r = m["runtime"]
+            if r.get("kind") == "llama_cpp_server":
+                runtime = LlamaCppServer(
+                    bin_path=r["bin"],
+                    host=r.get("host","127.0.0.1"),
+                    port=int(r.get("port",8080)),
+                    args=r.get("args", []),
+                    log_path=r.get("log", f"logs/llama_server_{name}.log"),
+                    tune=self._tune_config(r.get("tune")),
+                    draft=r.get("draft"),
                 )
-            else:
-                raise ValueError(f"Unknown provider type: {typ}")
+                supervisor = RuntimeSupervisor(name, runtime)
+                self._apply_live(runtime, supervisor, r)
+
+        return ModelEntry(
+            name=name, display_name=display, type=typ, provider=self._build_provider(m, defaults),
+            runtime=runtime, supervisor=supervisor, spec=copy.deepcopy(m),
+            tokenizer=self._build_tokenizer(m, runtime), context=self._context(m, runtime),
+            on_lease=self._leases.set,
+        )
+
+    @staticmethod
+    def _apply_live(runtime: LlamaCppServer, supervisor: RuntimeSupervisor, r: Dict[str, Any]) -> None:
+        """Settings from RUNTIME_LIVE_KEYS; safe on a running runtime."""
+        runtime.log.max_bytes = int(r.get("log_max_mb", 50)) * 1024**2
+        runtime.log.backups = int(r.get("log_backups", 5))
+        sup = r.get("supervise") or {}
+        supervisor.interval = float(sup.get("interval", 5.0))
+        supervisor.min_backoff = float(sup.get("min_backoff", 1.0))
+        supervisor.max_backoff = float(sup.get("max_backoff", 60.0))
 
-            self.models[name] = ModelEntry(
-                name=name, display_name=display, type=typ, provider=prov, runtime=runtime
+    @staticmethod
+    def _launch_spec(r: Dict[str, Any] | None) -> Dict[str, Any]:
+        return {k: v for k, v in (r or {}).items() if k not in RUNTIME_LIVE_KEYS}
+
+    @staticmethod
+    def _build_tokenizer(m: Dict[str, Any], runtime) -> Tokenizer | None:
+        # `tokenizer: {kind: llama_server|hf, url|path, overhead, cache_size}` or `tokenizer: false`;
+        # default: the model's own llama-server, or the transformers model's tokenizer
+        t = m.get("tokenizer", {})
+        if t is False:
+            return None
+        t = dict(t or {})
+        kind = t.pop("kind", None) or ("llama_server" if isinstance(runtime, LlamaCppServer)
+                                       else "hf" if m["type"] == "transformers" else None)
+        if kind == "llama_server":
+            url = t.pop("url", None) or (runtime and f"http://{runtime.host}:{runtime.port}")
+            if not url:
+                raise ValueError(f"{m['name']}: tokenizer kind llama_server needs a url (no runtime to use)")
+            backend = LlamaServerBackend(os.path.expandvars(url))
+        elif kind == "hf":
+            path = t.pop("path", None) or (m.get("transformers") or {}).get("model_path")
+            if not path:
+                raise ValueError(f"{m['name']}: tokenizer kind hf needs a path")
+            backend = HFBackend(os.path.expandvars(path))
+        elif kind is None:
+            return None
+        else:
+            raise ValueError(f"{m['name']}: unknown tokenizer kind: {kind}")
+        return Tokenizer(backend, overhead=int(t.get("overhead", 16)), cache_size=int(t.get("cache_size", 4096)))
+
+    @staticmethod
+    def _context(m: Dict[str, Any], runtime) -> int | None:
+        if m.get("context"):
+            return int(m["context"])
+        return runtime.context_size if isinstance(runtime, LlamaCppServer) else None
+
+    @staticmethod
+    def _build_provider(m: Dict[str, Any], defaults: Dict[str, Any]) -> BaseProvider:
+        name, typ = m["name"], m["type"]
+        display = m.get("display_name", name)
+        if typ in IN_PROCESS_TYPES and settings.APP_ROLE == "worker":
+            raise ValueError(f"{name}: type {typ} loads the model in-process, once per worker; "
+                             "under `python -m app.serve` put it behind an OpenAI-compatible server "
+                             "(type: openai), or run a single process with uvicorn")
+        if typ == "openai":
+            o = m["openai"]
+            return OpenAIProvider(
+                name=name,
+                display_name=display,
+                base_url=os.path.expandvars(o["base_url"]),
+                api_key=os.path.expandvars(o.get("api_key","")),
+                model=o["model"],
+                defaults={**defaults, **(m.get("llm") or {})},
+            )
+        if typ == "transformers":
+            t = m["transformers"]
+            return TransformersProvider(
+                name=name,
+                display_name=display,
+                model_path=os.path.expandvars(t["model_path"]),
+                defaults={**defaults, **(m.get("llm") or {})},
+                device=t.get("device", "auto"),
+                dtype=t.get("dtype", "auto"),
+                max_batch_size=int(t.get("max_batch_size", 8)),
+                max_wait_ms=float(t.get("max_wait_ms", 10)),
+                env=t.get("env"),
             )
+        raise ValueError(f"Unknown provider type: {typ}")
+
+    @staticmethod
+    def _tune_config(t) -> Dict[str, Any] | None:
+        # `tune: auto` or `tune: {calibrate: true, numa_node: 1, membind: true, bench: path/to/llama-bench}`
+        if not t:
+            return None
+        cfg = dict(t) if isinstance(t, dict) else {}
+        cfg.setdefault("cache_dir", settings.RUNTIME_TUNING_DIR)
+        return cfg
+
+    def _place_runtimes(self, only: Optional[List[object]] = None):
+        # spread tuned runtimes round-robin over NUMA nodes (L3 domains if they outnumber nodes);
+        # `only` restricts (re)placement to new runtimes so running ones keep their CPUs
+        tuned = [e.runtime for e in self.models.values() if e.runtime and e.runtime.tune is not None]
+        if not tuned or (only is not None and not any(rt in only for rt in tuned)):
+            return
+        topo = probe_topology()
+        domains = topo.placement_domains(len(tuned))
+        auto = 0
+        for rt in tuned:
+            node = rt.tune.get("numa_node")
+            pinned = node is not None and int(node) in topo.numa_nodes
+            if only is None or rt in only:
+                rt.place(topo, topo.numa_nodes[int(node)] if pinned else domains[auto % len(domains)])
+            if not pinned:
+                auto += 1
+
+    @property
+    def owns_runtimes(self) -> bool:
+        return self.role != "worker"
+
+    @property
+    def serves(self) -> bool:
+        return self.role != "owner"
 
     async def startup(self):
-        # start all runtimes first, then providers (if they need it)
-        for e in self.models.values():
-            if e.runtime:
-                await e.runtime.start()
-        for e in self.models.values():
-            await e.provider.startup()
+        # providers are cheap; bring them up first so models without a runtime serve immediately
+        if self.serves:
+            for e in self.models.values():
+                await e.provider.startup()
+        # each supervisor starts its runtime in the background and restarts it on crash;
+        # readiness is queried via status()/is_ready()
+        if self.owns_runtimes:
+            for e in self.models.values():
+                if e.supervisor:
+                    e.supervisor.start()
+        if self.role != "all":
+            self._generation = await asyncio.to_thread(store.get, "models:generation", 0)
+            self._sync = asyncio.create_task(self._sync_loop())
+        if self.role == "worker":
+            self._lease_task = asyncio.create_task(self._lease_loop())
 
     async def shutdown(self):
+        for t in (self._watcher, self._sync, self._lease_task):
+            if t:
+                t.cancel()
+        self._watcher = self._sync = self._lease_task = None
+        # cutting drains short still stops the retired runtimes (see _retire)
+        retiring = list(self._retiring)
+        for t in retiring:
+            t.cancel()
+        await asyncio.gather(*retiring, return_exceptions=True)
+        await asyncio.gather(*(e.tokenizer.close() for e in self.models.values() if e.tokenizer),
+                             return_exceptions=True)
         for e in self.models.values():
             await e.provider.shutdown()
-        for e in self.models.values():
-            if e.runtime:
-                await e.runtime.stop()
+        await asyncio.gather(
+            *(e.supervisor.stop() for e in self.models.values() if e.supervisor),
+            return_exceptions=True,
+        )
 
-    def get(self, model_name: str) -> BaseProvider:
+    # --- hot reload ---
+
+    @staticmethod
+    def _stat(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def watch(self, interval: float) -> None:
+        """Poll models.yaml and reload() when its mtime changes; bad edits are logged and skipped."""
+        async def loop():
+            while True:
+                await asyncio.sleep(interval)
+                mtime = self._stat(self.path)
+                if mtime is None or mtime == self._mtime:
+                    continue
+                self._mtime = mtime
+                try:
+                    changes = await self.reload()
+                    log.info("reloaded %s: %s", self.path, changes)
+                except Exception as e:
+                    log.error("reload of %s failed, keeping current models: %s", self.path, e)
+
+        if interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(loop())
+
+    async def reload(self, path: str | None = None) -> Dict[str, List[str]]:
+        """
+        Re-read models.yaml and reconcile against the running models:
+          added      -> built and started
+          removed    -> unlisted, drained, stopped
+          runtime or provider section changed -> replaced (old entry drained first; a
+                        runtime is restarted only if a launch-relevant key of its own
+                        section changed)
+          only display_name / llm / global defaults, or runtime supervise / log_max_mb /
+          log_backups changed -> updated in place
+        Untouched models keep running. Streams hold a lease on the entry they started on,
+        so they finish on the old provider/runtime before it is shut down.
+
+        Returns once new requests see the new config. Draining runs in the background; only
+        a runtime that takes over from a retired one (same model, or same host:port) waits
+        for it to stop. Other new runtimes start right away.
+        """
+        async with self._reload_lock:
+            path = path or self.path
+            defaults, specs = self._read(path)  # parse errors leave the running state alone
+            self.path = path
+            self._mtime = self._stat(path)
+
+            added, replaced, updated = [], [], []
+            new: Dict[str, ModelEntry] = {}
+            for name, m in specs.items():
+                old = self.models.get(name)
+                if old is None:
+                    new[name] = self._build(m, defaults)
+                    added.append(name)
+                elif self._launch_spec(m.get("runtime")) != self._launch_spec(old.spec.get("runtime")):
+                    new[name] = self._build(m, defaults)
+                    replaced.append(name)
+                elif m["type"] != old.type or m.get(m["type"]) != old.spec.get(old.type):
+                    # same runtime, new client config: keep the process, swap the provider
+                    new[name] = ModelEntry(
+                        name=name, display_name=m.get("display_name", name), type=m["type"],
+                        provider=self._build_provider(m, defaults), runtime=old.runtime,
+                        supervisor=old.supervisor, spec=copy.deepcopy(m),
+                        tokenizer=self._build_tokenizer(m, old.runtime), context=self._context(m, old.runtime),
+                        on_lease=self._leases.set,
+                    )
+                    replaced.append(name)
+                elif m != old.spec or defaults != self.defaults:
+                    updated.append(name)
+            removed = [n for n in self.models if n not in specs]
+
+            if self.serves:
+                for name in added + replaced:
+                    await new[name].provider.startup()
+
+            # swap: new requests see the new config from here on
+            retired = [self.models.pop(n) for n in removed] + [self.models[n] for n in replaced]
+            retired_tokenizers = [e.tokenizer for e in retired]
+            for name in updated:
+                m, e = specs[name], self.models[name]
+                e.display_name = e.provider.display_name = m.get("display_name", name)
+                # rebinding (not mutating) keeps streams that already merged the old dict consistent
+                e.provider.defaults = {**defaults, **(m.get("llm") or {})}
+                if (m.get("tokenizer"), m.get("context")) != (e.spec.get("tokenizer"), e.spec.get("context")):
+                    retired_tokenizers.append(e.tokenizer)
+                    e.tokenizer, e.context = self._build_tokenizer(m, e.runtime), self._context(m, e.runtime)
+                if e.supervisor and m.get("runtime") != e.spec.get("runtime"):
+                    self._apply_live(e.runtime, e.supervisor, m["runtime"])
+                e.spec = copy.deepcopy(m)
+            for name in replaced:
+                e = new[name]
+                if e.supervisor and e.supervisor is self.models[name].supervisor:
+                    self._apply_live(e.runtime, e.supervisor, specs[name]["runtime"])   # carried-over runtime
+            self.defaults = defaults
+            self.models.update(new)
+            self.models = {n: self.models[n] for n in specs}  # keep models.yaml order
+            shared = {id(e.runtime) for e in retired if e.runtime}
+            if self.owns_runtimes:
+                self._place_runtimes(only=[e.runtime for e in new.values() if e.runtime and id(e.runtime) not in shared])
+
+            # drain and stop what was replaced or removed in the background; a new runtime
+            # that would collide with a retired one (its port) starts once that one is stopped
+            retiring = {id(e): self._background(self._retire(e, new.get(e.name))) for e in retired}
+            for e in new.values():
+                if not (e.supervisor and self.owns_runtimes):
+                    continue
+                before = [retiring[id(o)] for o in retired if o.name == e.name or self._same_port(o, e)]
+                if before:
+                    self._background(self._start_after(e, before))
+                else:
+                    e.supervisor.start()
+            self._background(self._close_after([t for t in retired_tokenizers if t], list(retiring.values())))
+
+            return {"added": added, "removed": removed, "replaced": replaced, "updated": updated}
+
+    def _background(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+        return task
+
+    @staticmethod
+    def _same_port(a: ModelEntry, b: ModelEntry) -> bool:
+        return bool(a.runtime and b.runtime) and (a.runtime.host, a.runtime.port) == (b.runtime.host, b.runtime.port)
+
+    async def _start_after(self, e: ModelEntry, before: List[asyncio.Task]) -> None:
+        await asyncio.wait(before)   # not gather: cancelling us must not cancel the drains
+        if self.models.get(e.name) is e:   # a later reload may have retired it meanwhile
+            e.supervisor.start()   # no-op for a supervisor carried over from the old entry
+
+    @staticmethod
+    async def _close_after(tokenizers: List[Tokenizer], before: List[asyncio.Task]) -> None:
+        try:
+            if before:
+                await asyncio.wait(before)
+        finally:
+            await asyncio.gather(*(t.close() for t in tokenizers), return_exceptions=True)
+
+    async def _retire(self, old: ModelEntry, successor: ModelEntry | None) -> None:
+        try:
+            if not await old.drain(settings.MODELS_DRAIN_TIMEOUT):
+                log.warning("model %s: %d stream(s) still running after %.0fs drain; stopping anyway",
+                            old.name, old.inflight, settings.MODELS_DRAIN_TIMEOUT)
+        finally:
+            # also when shutdown() cuts the drain short: retired runtimes must not outlive the app
+            if successor is None or successor.provider is not old.provider:
+                await old.provider.shutdown()
+            if old.supervisor and self.owns_runtimes and (successor is None or successor.supervisor is not old.supervisor):
+                await old.supervisor.stop()
+
+    async def reload_everywhere(self) -> Dict[str, List[str]]:
+        """reload() here and, in multi-process mode, ask the owner and other workers to follow."""
+        if self.role != "all":
+            self._generation = await asyncio.to_thread(store.incr, "models:generation")
+        return await self.reload()
+
+    # --- multi-process (owner / worker) ---
+
+    def _runtime_state(self, e: ModelEntry) -> str:
+        if self.owns_runtimes:
+            return e.runtime.state.value
+        return self._remote.get(e.name, {}).get("state", "unavailable")  # no owner heartbeat
+
+    async def snapshots(self) -> List[Dict[str, Any]]:
+        if self.owns_runtimes:
+            data = await asyncio.to_thread(collect)
+            return [e.supervisor.snapshot(data) for e in self.models.values() if e.supervisor]
+        return [self._remote[n]["snapshot"] for n, e in self.models.items() if e.supervisor and n in self._remote]
+
+    async def restart_runtime(self, name: str) -> bool:
+        e = self.models.get(name)
+        if not e or not e.supervisor:
+            return False
+        if self.owns_runtimes:
+            e.supervisor.restart()
+        else:
+            await asyncio.to_thread(store.push, "owner", {"restart": name})
+        return True
+
+    async def _sync_loop(self, interval: float = 1.0):
+        # owner: publish runtime state (with a TTL, so a dead owner reads as "unavailable") and
+        # run queued commands; worker: refresh its view of runtime state. Both follow reloads
+        # requested elsewhere via the shared generation counter.
+        while True:
+            try:
+                if self.owns_runtimes:
+                    data = await asyncio.to_thread(collect)   # decode stats come from the workers
+                    states = {n: {"state": e.runtime.state.value, "snapshot": e.supervisor.snapshot(data)}
+                              for n, e in self.models.items() if e.supervisor}
+                    commands = await asyncio.to_thread(self._publish, states, interval * 5)
+                    for cmd in commands:
+                        if "restart" in cmd:
+                            await self.restart_runtime(cmd["restart"])
+                else:
+                    names = [n for n, e in self.models.items() if e.runtime]
+                    self._remote = await asyncio.to_thread(
+                        lambda: {n: v for n in names if (v := store.get(f"runtime:{n}")) is not None})
+                gen = await asyncio.to_thread(store.get, "models:generation", 0)
+                if gen != self._generation:
+                    self._generation = gen
+                    log.info("reload requested by another process: %s", await self.reload())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("registry sync failed")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _publish(states: Dict[str, Any], ttl: float) -> List[Dict[str, Any]]:
+        for n, v in states.items():
+            store.set(f"runtime:{n}", v, ttl=ttl)
+        return store.pop_all("owner")
+
+    @staticmethod
+    def _lease_key() -> str:
+        return f"{INTERACTIVE_PREFIX}{socket.gethostname()}:{os.getpid()}"
+
+    async def _lease_loop(self, interval: float = 1.0):
+        # worker: publish this process's interactive stream counts as soon as a lease starts or
+        # ends, and every `interval` with a TTL, so a dead worker's counts expire
+        key = self._lease_key()
+        while True:
+            try:
+                await asyncio.wait_for(self._leases.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._leases.clear()
+            counts = {n: e.interactive for n, e in self.models.items() if e.interactive}
+            try:
+                await asyncio.to_thread(store.set, key, counts, interval * 5)
+            except Exception:
+                log.exception("publishing interactive streams failed")
+
+    async def interactive(self, model_name: str) -> int:
+        """Interactive streams in flight on a model, across all workers in multi-process mode."""
+        e = self.models.get(model_name)
+        local = e.interactive if e else 0
+        if self.role != "worker":
+            return local
+        others = await asyncio.to_thread(store.scan, INTERACTIVE_PREFIX)
+        key = self._lease_key()   # ours is counted live rather than as last published
+        return local + sum(v.get(model_name, 0) for k, v in others.items() if k != key)
+
+    def is_ready(self, model_name: str) -> bool:
+        e = self.models.get(model_name)
+        return bool(e) and e.provider.ready and (e.runtime is None or self._runtime_state(e) == "ready")
+
+    def status(self, model_name: str) -> str:
+        e = self.models[model_name]
+        if e.runtime and self._runtime_state(e) != "ready":
+            return self._runtime_state(e)
+        if not e.provider.ready:
+            return "failed" if getattr(e.provider, "error", None) else "loading"
+        return "ready"
+
+    def entry(self, model_name: str) -> ModelEntry:
         if model_name not in self.models:
             raise KeyError(f"Model not found: {model_name}")
-        return self.models[model_name].provider
+        return self.models[model_name]
+
+    def get(self, model_name: str) -> BaseProvider:
+        return self.entry(model_name).provider
 
 registry = Registry()
@@ -1,86 +1,327 @@
 # app/llm/runtimes/llama_cpp_server.py
 from __future__ import annotations
-import asyncio, time, os
-from subprocess import Popen
-from typing import Optional
+import asyncio, time, os, logging
+from asyncio.subprocess import Process
+from dataclasses import asdict
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from pathlib import Path
-import httpx
+from .logfile import RotatingLog
+from .topology import (
+    HostTopology, TunedParams, TuningCache, affinity_prefix, calibrate, heuristic_params, pin_preexec,
+)
+
+if TYPE_CHECKING:
+    import httpx
+
+log = logging.getLogger(__name__)
+
+# flags the tuner owns, with their long-form aliases; "0"/"-1" mean "let llama.cpp decide"
+_TUNED_FLAGS = {
+    "threads": ("-t", "--threads"),
+    "threads_batch": ("-tb", "--threads-batch"),
+    "batch": ("-b", "--batch-size"),
+    "ubatch": ("-ub", "--ubatch-size"),
+}
+
+
+def apply_tuned_args(args: List[str], params: TunedParams) -> List[str]:
+    """Fill tuned values into args; explicit (non-auto) values in models.yaml win."""
+    out = list(args)
+    for attr, names in _TUNED_FLAGS.items():
+        value = str(getattr(params, attr))
+        idx = next((i for i, a in enumerate(out) if a in names), None)
+        if idx is None:
+            out += [names[0], value]
+        elif idx + 1 < len(out) and out[idx + 1] in ("0", "-1"):
+            out[idx + 1] = value
+    return out
+
+
+# `runtime.draft` keys in models.yaml -> llama-server speculative decoding flags
+_DRAFT_FLAGS = {
+    "model": ("-md", "--model-draft"),
+    "max": ("--draft-max", "--draft", "--draft-n"),
+    "min": ("--draft-min", "--draft-n-min"),
+    "p_min": ("--draft-p-min",),
+    "ngl": ("-ngld", "--gpu-layers-draft", "--n-gpu-layers-draft"),
+    "ctx": ("-cd", "--ctx-size-draft"),
+    "threads": ("-td", "--threads-draft"),
+    "device": ("-devd", "--device-draft"),
+}
+
+
+def draft_args(args: List[str], draft: Dict[str, Any]) -> List[str]:
+    """Append speculative decoding flags for `draft`; flags already present in args win."""
+    unknown = set(draft) - set(_DRAFT_FLAGS)
+    if unknown:
+        raise ValueError(f"Unknown runtime.draft keys: {sorted(unknown)} (expected {sorted(_DRAFT_FLAGS)})")
+    if "model" not in draft:
+        raise ValueError("runtime.draft needs a `model` (path to the draft GGUF)")
+    out = list(args)
+    for key, names in _DRAFT_FLAGS.items():
+        if key in draft and not any(a in names for a in out):
+            out += [names[0], str(draft[key])]
+    return out
+
+
+def _check_gguf(path: str, what: str) -> None:
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"{what} GGUF not found: {p}")
+    with p.open("rb") as f:
+        if f.read(4) != b"GGUF":
+            raise ValueError(f"{what} is not a GGUF file: {p}")
+
+
+class RuntimeState(str, Enum):
+    STOPPED = "stopped"
+    STARTING = "starting"
+    READY = "ready"
+    FAILED = "failed"
+    STOPPING = "stopping"
+
 
 class LlamaCppServer:
-    def __init__(self, bin_path: str, host: str, port: int, args: list[str]):
+    def __init__(self, bin_path: str, host: str, port: int, args: list[str],
+                 log_path: str = "logs/llama_server.log", log_max_mb: int = 50, log_backups: int = 5,
+                 tune: Optional[Dict[str, Any]] = None, draft: Optional[Dict[str, Any]] = None):
         self.bin = bin_path
         self.host = host
         self.port = port
-        self.args = args
-        self.proc: Optional[Popen] = None
-        self.log_path = Path("logs/llama_server.log")
+        # speculative decoding: draft flags become part of the launch args (validated here)
+        self.args = draft_args(args, draft) if draft else list(args)
+        self.tune = tune            # None = launch args exactly as configured
+        self.topology: Optional[HostTopology] = None
+        self.placement: Optional[List[int]] = None
+        self.tuned: Optional[TunedParams] = None
+        self.proc: Optional[Process] = None
+        self.log_path = Path(log_path)
+        self.log = RotatingLog(self.log_path, max_bytes=log_max_mb * 1024**2, backups=log_backups)
+        self._pump: Optional[asyncio.Task] = None
+        self.state: RuntimeState = RuntimeState.STOPPED
+        self.error: Optional[str] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == RuntimeState.READY
+
+    @property
+    def alive(self) -> bool:
+        """False once a process we spawned has exited (an adopted external server has no proc)."""
+        return self.proc is None or self.proc.returncode is None
+
+    @property
+    def adopted(self) -> bool:
+        """READY on a server that was already running; there is no process to watch, only probes."""
+        return self.state == RuntimeState.READY and self.proc is None
+
+    def status(self) -> dict:
+        return {
+            "state": self.state.value,
+            "pid": self.proc.pid if self.proc else None,
+            "error": self.error,
+            "tuning": asdict(self.tuned) if self.tuned else None,
+            "draft_model": self._draft_path(),
+        }
+
+    def place(self, topology: HostTopology, cpus: List[int]) -> None:
+        """Assign this runtime a CPU set (NUMA node / L3 domain); applied on next start."""
+        self.topology = topology
+        self.placement = list(cpus)
+
+    def _set_state(self, state: RuntimeState, error: Optional[str] = None) -> None:
+        self.state = state
+        self.error = error
+
+    async def scrape(self, path: str, timeout: float = 2.0) -> Optional[httpx.Response]:
+        """GET a server endpoint (e.g. /metrics, /slots); None if unreachable or not 200."""
+        try:
+            r = await self._probe_client().get(path, timeout=timeout)
+        except Exception:
+            return None
+        return r if r.status_code == 200 else None
+
+    def _probe_client(self) -> httpx.AsyncClient:
+        # one client for every readiness probe (keeps the connection pool warm)
+        if self._client is None or self._client.is_closed:
+            import httpx
+            self._client = httpx.AsyncClient(base_url=f"http://{self.host}:{self.port}")
+        return self._client
+
+    def _arg(self, *names: str) -> Optional[str]:
+        for i, a in enumerate(self.args[:-1]):
+            if a in names:
+                return self.args[i+1]
+        return None
+
+    def _model_path(self) -> Optional[str]:
+        return self._arg("-m", "--model")
+
+    @property
+    def context_size(self) -> Optional[int]:
+        """Tokens one request can use: -c split across -np slots; None if left to the server."""
+        ctx = self._arg("-c", "--ctx-size")
+        if not ctx or int(ctx) <= 0:
+            return None
+        slots = self._arg("-np", "--parallel")
+        return int(ctx) // max(1, int(slots)) if slots else int(ctx)
+
+    def _draft_path(self) -> Optional[str]:
+        return self._arg(*_DRAFT_FLAGS["model"])
+
+    def _gpu_offload(self) -> bool:
+        for flag in ("-ngl", "--n-gpu-layers", "--gpu-layers"):
+            if flag in self.args:
+                i = self.args.index(flag)
+                return i + 1 < len(self.args) and self.args[i+1] not in ("0",)
+        return False
+
+    async def _resolve_tuning(self) -> Optional[TunedParams]:
+        if self.tune is None or self.topology is None or not self.placement:
+            return None
+        cache = TuningCache(self.tune["cache_dir"])
+        key = f"{self._model_path()}@{','.join(map(str, self.placement))}"
+        params = cache.get(key, self.topology)
+        if params is not None and (params.calibrated or not self.tune.get("calibrate")):
+            return params
+        params = heuristic_params(self.topology, self.placement, self._gpu_offload())
+        bench = self.tune.get("bench") or str(Path(self.bin).with_name("llama-bench"))
+        if self.tune.get("calibrate") and self._model_path() and Path(bench).exists():
+            try:
+                params = await calibrate(bench, self._model_path(), params, membind=bool(self.tune.get("membind")))
+            except Exception:
+                log.exception("llama-bench calibration failed; using topology heuristics")
+        cache.put(key, self.topology, params)
+        return params
 
     def _preflight(self):
         # binary exists?
         b = Path(self.bin)
         if not b.exists():
             raise FileNotFoundError(f"llama.cpp server binary not found: {b}")
-        # model file exists? (naive: look for '-m' and grab the next token)
-        if "-m" in self.args:
-            try:
-                mi = self.args.index("-m")
-                mpath = Path(self.args[mi+1])
-                if not mpath.exists():
-                    raise FileNotFoundError(f"Model GGUF not found: {mpath}")
-            except Exception:
-                pass
+        # model (and draft model) exist and are GGUF files; fail here rather than
+        # minutes into a load with an error buried in the server log
+        model = self._model_path()
+        if model:
+            _check_gguf(model, "Model")
+        draft = self._draft_path()
+        if draft:
+            _check_gguf(draft, "Draft model")
 
     async def start(self, wait_timeout: float = 180.0) -> None:
-        # if already up, don't spawn
-        if await self._is_ready(0.1):
+        if self.state in (RuntimeState.STARTING, RuntimeState.READY):
             return
-        self._preflight()
-        self.log_path.parent.mkdir(parents=True, exist_ok=True)
-        logf = self.log_path.open("ab", buffering=0)  # append binary, unbuffered
+        self._set_state(RuntimeState.STARTING)
+        try:
+            # if already up (e.g. started externally), don't spawn
+            if await self._is_ready(0.1):
+                self._set_state(RuntimeState.READY)
+                return
+            self._preflight()
+            await self._spawn()
+            await self._wait_ready(wait_timeout)
+        except asyncio.CancelledError:
+            await self._terminate()
+            self._set_state(RuntimeState.STOPPED)
+            raise
+        except Exception as e:
+            await self._terminate()
+            self._set_state(RuntimeState.FAILED, self._failure_detail(e))
+            raise RuntimeError(self.error) from e
+        self._set_state(RuntimeState.READY)
+
+    async def _spawn(self) -> None:
         # Keep env; you may set CUDA_VISIBLE_DEVICES externally if needed
         env = os.environ.copy()
-        # Spawn with visible logs
-        self.proc = Popen([self.bin, *self.args], stdout=logf, stderr=logf, env=env)
+        self.tuned = await self._resolve_tuning()
+        args, prefix, preexec = self.args, [], None
+        if self.tuned:
+            args = apply_tuned_args(self.args, self.tuned)
+            if self._draft_path() and not any(a in _DRAFT_FLAGS["threads"] for a in args):
+                args += [_DRAFT_FLAGS["threads"][0], str(self.tuned.threads)]
+            prefix = affinity_prefix(self.tuned.cpus, self.tuned.numa_node, bool(self.tune.get("membind")))
+            preexec = None if prefix else pin_preexec(self.tuned.cpus)
+        self.log.open()
+        self.proc = await asyncio.create_subprocess_exec(
+            *prefix, self.bin, *args,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, env=env,
+            preexec_fn=preexec,
+        )
+        self._pump = asyncio.create_task(self._pump_log(self.proc))
+
+    async def _pump_log(self, proc: Process) -> None:
+        # drain the child's output into the rotating log; compression runs off-loop
+        compressing: Optional[asyncio.Task] = None
         try:
-            await self._wait_ready(wait_timeout)
-        except Exception:
-            # tail last lines into the exception for quick hints
-            try:
-                with self.log_path.open("rb") as lf:
-                    tail = lf.read()[-4096:].decode("utf-8", "ignore")
-                raise RuntimeError(
-                    "llama.cpp server did not become ready.\n--- llama_server.log tail ---\n"
-                    + tail
-                )
-            finally:
-                # Let it keep running if it actually started; otherwise kill
-                if self.proc and self.proc.poll() is None:
-                    try: self.proc.terminate()
-                    except Exception: pass
-                self.proc = None
+            while chunk := await proc.stdout.read(64 * 1024):
+                self.log.write(chunk)
+                # roll inline and gzip in a thread, so the pipe keeps draining meanwhile;
+                # compressions are chained so archives shift in order
+                if self.log.needs_rotation:
+                    rolled = self.log.roll()
+                    if rolled is not None:
+                        compressing = asyncio.create_task(self._compress_log(compressing, rolled))
+        finally:
+            self.log.close()
+            if compressing is not None:
+                await asyncio.gather(compressing, return_exceptions=True)
+
+    async def _compress_log(self, previous: Optional[asyncio.Task], rolled: Path) -> None:
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        try:
+            await asyncio.to_thread(self.log.compress, rolled)
+        except Exception as e:
+            log.warning("compressing %s failed: %s", rolled, e)
+
+    def _failure_detail(self, e: Exception) -> str:
+        # tail last lines into the error for quick hints
+        msg = str(e) or e.__class__.__name__
+        tail = self.log.tail()
+        if not tail:
+            return msg
+        return f"{msg}\n--- {self.log_path.name} tail ---\n{tail}"
 
     async def stop(self) -> None:
-        if self.proc and self.proc.poll() is None:
+        if self.state != RuntimeState.STOPPED:
+            self._set_state(RuntimeState.STOPPING)
+        await self._terminate()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._set_state(RuntimeState.STOPPED)
+
+    async def _terminate(self, grace: float = 5.0) -> None:
+        proc, self.proc = self.proc, None
+        pump, self._pump = self._pump, None
+        if proc is not None and proc.returncode is None:
             try:
-                self.proc.terminate()
-                self.proc.wait(timeout=5)
-            except Exception:
-                try: self.proc.kill()
-                except Exception: pass
-        self.proc = None
+                proc.terminate()
+                await asyncio.wait_for(proc.wait(), grace)
+            except ProcessLookupError:
+                pass
+            except asyncio.TimeoutError:
+                try: proc.kill()
+                except ProcessLookupError: pass
+                await proc.wait()
+        if pump is not None:
+            # pipe hits EOF once the child is gone; the pump flushes and closes the log
+            await asyncio.gather(pump, return_exceptions=True)
 
     async def _is_ready(self, timeout: float) -> bool:
-        url = f"http://{self.host}:{self.port}/v1/models"
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                r = await client.get(url)
-                return r.status_code == 200
+            r = await self._probe_client().get("/v1/models", timeout=timeout)
+            return r.status_code == 200
         except Exception:
             return False
 
     async def _wait_ready(self, timeout: float) -> None:
-        t0 = time.time()
-        while time.time() - t0 < timeout:
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < timeout:
+            if self.proc is not None and self.proc.returncode is not None:
+                raise RuntimeError(f"llama.cpp server exited with code {self.proc.returncode}")
             if await self._is_ready(2.0):
                 return
             await asyncio.sleep(0.5)
@@ -0,0 +1,79 @@
+# app/llm/runtimes/logfile.py
+from __future__ import annotations
+import gzip, shutil, time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+
+class RotatingLog:
+    """Size-capped log sink: when `max_bytes` is exceeded the file becomes `<name>.1.gz`
+    and older archives shift up to `backups`. Rotation is split in two: roll() (renames,
+    cheap, inline with writes) and compress() (gzip, blocking; run it in a worker thread)."""
+
+    def __init__(self, path: Path, max_bytes: int = 50 * 1024**2, backups: int = 5):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._f: Optional[BinaryIO] = None
+        self._size = 0
+
+    def open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open("ab")
+        self._size = self._f.tell()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def write(self, chunk: bytes) -> None:
+        if self._f is None:
+            self.open()
+        self._f.write(chunk)
+        self._f.flush()
+        self._size += len(chunk)
+
+    @property
+    def needs_rotation(self) -> bool:
+        return self.max_bytes > 0 and self._size >= self.max_bytes
+
+    def _archive(self, i: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{i}.gz")
+
+    def roll(self) -> Optional[Path]:
+        """Start a fresh file. Returns the rolled-out one for compress(), or None if backups
+        are off (it was deleted)."""
+        self.close()
+        rolled = None
+        if self.backups <= 0:
+            self.path.unlink(missing_ok=True)
+        else:
+            rolled = self.path.with_name(f"{self.path.name}.rolling.{time.time_ns()}")
+            self.path.rename(rolled)
+        self.open()
+        return rolled
+
+    def compress(self, rolled: Path) -> None:
+        """Shift the archives and gzip `rolled` into `<name>.1.gz`. Blocking; call from a
+        worker thread, one at a time, in roll() order."""
+        self._archive(self.backups).unlink(missing_ok=True)
+        for i in range(self.backups - 1, 0, -1):
+            src = self._archive(i)
+            if src.exists():
+                src.rename(self._archive(i + 1))
+        dest = self._archive(1)
+        tmp = dest.with_name(dest.name + ".tmp")
+        with rolled.open("rb") as src, gzip.open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        tmp.replace(dest)
+        rolled.unlink(missing_ok=True)
+
+    def tail(self, n: int = 4096) -> str:
+        try:
+            with self.path.open("rb") as lf:
+                lf.seek(0, 2)
+                lf.seek(max(0, lf.tell() - n))
+                return lf.read().decode("utf-8", "ignore")
+        except OSError:
+            return ""
@@ -0,0 +1,189 @@
+# app/llm/runtimes/supervisor.py
+from __future__ import annotations
+import asyncio, logging, os, time
+from typing import Any, Dict, Optional
+from .llama_cpp_server import LlamaCppServer, RuntimeState
+from ...metrics import LLM_DECODE_RATE, LLM_DRAFT_TOKENS, Dump, collect, value
+
+log = logging.getLogger(__name__)
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_proc_stats(pid: int) -> Optional[Dict[str, Any]]:
+    """RSS/threads from /proc/<pid>/status and cumulative CPU seconds from /proc/<pid>/stat."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        with open(f"/proc/{pid}/stat") as f:
+            # comm may contain spaces; fields after the closing paren are fixed
+            fields = f.read().rsplit(")", 1)[1].split()
+    except (OSError, ValueError):
+        return None
+    rss_kb = int(status.get("VmRSS", "0 kB").split()[0])
+    utime, stime = int(fields[11]), int(fields[12])
+    return {
+        "rss_bytes": rss_kb * 1024,
+        "threads": int(status.get("Threads", "0").strip()),
+        "cpu_seconds": (utime + stime) / _CLK_TCK,
+    }
+
+
+def parse_prometheus(text: str) -> Dict[str, float]:
+    """Flat `name{labels} value` map; comments and malformed lines are skipped."""
+    out: Dict[str, float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        parts = line.rsplit(None, 1)
+        if len(parts) != 2:
+            continue
+        try:
+            out[parts[0]] = float(parts[1])
+        except ValueError:
+            continue
+    return out
+
+
+def decode_summary(model: str, data: Optional[Dump] = None) -> Dict[str, Any]:
+    """Mean decode tok/s and draft acceptance since app start, from the app's own metrics
+    (summed over all processes: the timings are recorded where requests are served)."""
+    data = collect() if data is None else data
+    rate = value(data, LLM_DECODE_RATE, model)          # [bucket counts..., sum]
+    drafted = value(data, LLM_DRAFT_TOKENS, model, "drafted") or 0
+    accepted = value(data, LLM_DRAFT_TOKENS, model, "accepted") or 0
+    n = sum(rate[:-1]) if rate else 0
+    return {
+        "responses": n,
+        "tokens_per_second": round(rate[-1] / n, 2) if n else None,
+        "draft_tokens": drafted,
+        "draft_accepted": accepted,
+        "draft_acceptance_rate": round(accepted / drafted, 3) if drafted else None,
+    }
+
+
+class RuntimeSupervisor:
+    """Owns a runtime's lifecycle: initial start, crash detection, restart with
+    exponential backoff, and periodic resource/server telemetry sampling."""
+
+    def __init__(self, name: str, runtime: LlamaCppServer, interval: float = 5.0,
+                 min_backoff: float = 1.0, max_backoff: float = 60.0, stable_after: float = 60.0):
+        self.name = name
+        self.runtime = runtime
+        self.interval = interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.restarts = 0
+        self.failures = 0          # consecutive; drives the backoff
+        self.last_exit: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.telemetry: Dict[str, Any] = {}
+        self._cpu_prev: Optional[tuple[float, float]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._force = False
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.runtime.stop()
+
+    def restart(self) -> None:
+        """Ask the loop for an immediate restart (admin action); resets the backoff."""
+        self.failures = 0
+        self._force = True
+        self._wake.set()
+
+    def _backoff(self) -> float:
+        if self.failures == 0:
+            return 0.0
+        return min(self.max_backoff, self.min_backoff * 2 ** (self.failures - 1))
+
+    async def _run(self) -> None:
+        first = True
+        while True:
+            rt = self.runtime
+            crashed = rt.state == RuntimeState.READY and not rt.alive
+            if crashed:
+                self.last_exit = rt.proc.returncode
+                log.warning("runtime %s exited with code %s", self.name, self.last_exit)
+                self.failures += 1
+            elif rt.adopted and await rt.scrape("/v1/models") is None:
+                # not our process, so no exit code: an unanswered probe is the crash signal
+                crashed = True
+                log.warning("runtime %s (adopted, not spawned here) stopped answering /v1/models", self.name)
+                self.failures += 1
+            if self._force or crashed or rt.state in (RuntimeState.STOPPED, RuntimeState.FAILED):
+                self._force = False
+                await self._restart(first)
+                first = False
+            elif self.started_at and time.monotonic() - self.started_at > self.stable_after:
+                self.failures = 0
+            await self._sample()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _restart(self, first: bool) -> None:
+        # stop first so a dead server is reported as unavailable during the backoff
+        await self.runtime.stop()
+        delay = self._backoff()
+        if delay:
+            log.info("restarting runtime %s in %.1fs", self.name, delay)
+            await asyncio.sleep(delay)
+        if not first:
+            self.restarts += 1
+        self._cpu_prev = None
+        try:
+            await self.runtime.start()
+            self.started_at = time.monotonic()
+        except Exception:
+            self.failures += 1
+            self.started_at = None
+            log.exception("runtime %s failed to start", self.name)
+
+    async def _sample(self) -> None:
+        rt = self.runtime
+        t: Dict[str, Any] = {"sampled_at": time.time()}
+        if rt.proc is not None and rt.alive:
+            ps = read_proc_stats(rt.proc.pid)
+            if ps:
+                now = time.monotonic()
+                if self._cpu_prev:
+                    dt = now - self._cpu_prev[0]
+                    if dt > 0:
+                        ps["cpu_percent"] = round(100.0 * (ps["cpu_seconds"] - self._cpu_prev[1]) / dt, 1)
+                self._cpu_prev = (now, ps["cpu_seconds"])
+                t["process"] = ps
+        if rt.ready:
+            # llama-server exposes these only with --metrics / --slots; absent -> None
+            r = await rt.scrape("/metrics")
+            t["metrics"] = parse_prometheus(r.text) if r is not None else None
+            r = await rt.scrape("/slots")
+            try:
+                t["slots"] = r.json() if r is not None else None
+            except ValueError:
+                t["slots"] = None
+        self.telemetry = t
+
+    def snapshot(self, metrics: Optional[Dump] = None) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            **self.runtime.status(),
+            "restarts": self.restarts,
+            "consecutive_failures": self.failures,
+            "last_exit_code": self.last_exit,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1) if self.started_at and self.runtime.ready else None,
+            "log": str(self.runtime.log_path),
+            "decode": decode_summary(self.name, metrics),
+            **self.telemetry,
+        }
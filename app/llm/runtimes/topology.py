@@ -0,0 +1,199 @@
+# app/llm/runtimes/topology.py
+from __future__ import annotations
+import asyncio, json, os, shutil, socket
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SYS_CPU = Path("/sys/devices/system/cpu")
+SYS_NODE = Path("/sys/devices/system/node")
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus: List[int] = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _read(p: Path) -> Optional[str]:
+    try:
+        return p.read_text().strip()
+    except OSError:
+        return None
+
+
+@dataclass
+class HostTopology:
+    logical_cpus: List[int]
+    # one representative (lowest-numbered) logical CPU per physical core
+    physical_cores: List[int]
+    numa_nodes: Dict[int, List[int]] = field(default_factory=dict)
+    l3_domains: List[List[int]] = field(default_factory=list)
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{len(self.logical_cpus)}c{len(self.physical_cores)}p{len(self.numa_nodes)}n{len(self.l3_domains)}l3"
+
+    def placement_domains(self, replicas: int) -> List[List[int]]:
+        """CPU sets to pin replicas to: NUMA nodes, or L3 domains once replicas outnumber nodes."""
+        nodes = [cpus for _, cpus in sorted(self.numa_nodes.items())] or [self.logical_cpus]
+        if replicas > len(nodes) and len(self.l3_domains) > len(nodes):
+            return self.l3_domains
+        return nodes
+
+    def node_of(self, cpus: List[int]) -> Optional[int]:
+        for n, node_cpus in self.numa_nodes.items():
+            if set(cpus) <= set(node_cpus):
+                return n
+        return None
+
+    def cores_in(self, cpus: List[int]) -> List[int]:
+        s = set(cpus)
+        return [c for c in self.physical_cores if c in s]
+
+
+def probe_topology() -> HostTopology:
+    """Read CPU/NUMA/cache layout from sysfs, restricted to CPUs this process may run on."""
+    try:
+        allowed = sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        allowed = list(range(os.cpu_count() or 1))
+    allowed_set = set(allowed)
+
+    cores: Dict[tuple, int] = {}
+    l3: Dict[str, List[int]] = {}
+    for c in allowed:
+        topo = SYS_CPU / f"cpu{c}" / "topology"
+        key = (_read(topo / "physical_package_id"), _read(topo / "core_id"))
+        if key == (None, None):
+            key = ("cpu", str(c))
+        cores.setdefault(key, c)
+        for idx in (SYS_CPU / f"cpu{c}" / "cache").glob("index*"):
+            if _read(idx / "level") == "3" and (shared := _read(idx / "shared_cpu_list")):
+                l3.setdefault(shared, [x for x in parse_cpulist(shared) if x in allowed_set])
+
+    nodes: Dict[int, List[int]] = {}
+    for nd in SYS_NODE.glob("node[0-9]*"):
+        cpus = [x for x in parse_cpulist(_read(nd / "cpulist") or "") if x in allowed_set]
+        if cpus:
+            nodes[int(nd.name[4:])] = cpus
+
+    return HostTopology(
+        logical_cpus=allowed,
+        physical_cores=sorted(cores.values()),
+        numa_nodes=nodes,
+        l3_domains=sorted((v for v in l3.values() if v), key=lambda v: v[0]),
+    )
+
+
+@dataclass
+class TunedParams:
+    threads: int
+    threads_batch: int
+    batch: int
+    ubatch: int
+    cpus: List[int]
+    numa_node: Optional[int] = None
+    calibrated: bool = False
+
+
+def heuristic_params(topo: HostTopology, cpus: List[int], gpu_offload: bool) -> TunedParams:
+    # token generation is memory-bound: one thread per physical core beats SMT siblings;
+    # prompt processing is compute-bound and benefits from every logical CPU
+    cores = topo.cores_in(cpus) or cpus
+    threads = max(1, len(cores))
+    threads_batch = max(1, len(cpus))
+    if gpu_offload:
+        batch, ubatch = 2048, 512
+    else:
+        batch, ubatch = 512, 512 if threads_batch >= 16 else 256
+    return TunedParams(threads, threads_batch, batch, ubatch, list(cpus), topo.node_of(cpus))
+
+
+def affinity_prefix(cpus: List[int], numa_node: Optional[int], membind: bool = False) -> List[str]:
+    """CPU pinning via numactl; [] means the caller falls back to sched_setaffinity. Memory is
+    bound to the node only on request (`membind`): strict binding covers the page cache of an
+    mmap'd model too, so a model larger than one node's RAM fails or OOMs."""
+    numactl = shutil.which("numactl") if membind and numa_node is not None else None
+    if not numactl or not cpus:
+        return []   # sched_setaffinity pins the CPUs just as well
+    return [numactl, f"--physcpubind={','.join(map(str, cpus))}", f"--membind={numa_node}"]
+
+
+def pin_preexec(cpus: List[int]):
+    def _pin():
+        os.sched_setaffinity(0, cpus)
+    return _pin
+
+
+async def calibrate(bench_bin: str, model: str, params: TunedParams, timeout: float = 600.0,
+                    membind: bool = False) -> TunedParams:
+    """Run llama-bench over a few thread counts inside the placement and keep the fastest
+    generation (-t) and prompt-processing (-tb) settings."""
+    cores = params.threads
+    candidates = sorted({max(1, cores // 2), max(1, cores * 3 // 4), cores, params.threads_batch})
+    prefix = affinity_prefix(params.cpus, params.numa_node, membind)
+    cmd = [*prefix, bench_bin,
+           "-m", model, "-p", "128", "-n", "32", "-r", "2", "-o", "json",
+           "-t", ",".join(map(str, candidates))]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        preexec_fn=None if prefix else pin_preexec(params.cpus),
+    )
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise RuntimeError("llama-bench calibration timed out")
+    if proc.returncode != 0:
+        raise RuntimeError(f"llama-bench exited with code {proc.returncode}")
+
+    best_tg = best_pp = (0.0, None)
+    for row in json.loads(out):
+        ts, t = float(row.get("avg_ts", 0.0)), int(row["n_threads"])
+        if row.get("n_gen", 0) > 0 and ts > best_tg[0]:
+            best_tg = (ts, t)
+        elif row.get("n_prompt", 0) > 0 and ts > best_pp[0]:
+            best_pp = (ts, t)
+    return TunedParams(
+        threads=best_tg[1] or params.threads,
+        threads_batch=best_pp[1] or params.threads_batch,
+        batch=params.batch, ubatch=params.ubatch,
+        cpus=params.cpus, numa_node=params.numa_node, calibrated=True,
+    )
+
+
+class TuningCache:
+    """Per-host JSON file of chosen settings, invalidated when the topology changes."""
+
+    def __init__(self, directory: str):
+        self.path = Path(directory) / f"{socket.gethostname()}.json"
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str, topo: HostTopology) -> Optional[TunedParams]:
+        entry = self._load().get(key)
+        if not entry or entry.get("topology") != topo.fingerprint:
+            return None
+        return TunedParams(**entry["params"])
+
+    def put(self, key: str, topo: HostTopology, params: TunedParams) -> None:
+        data = self._load()
+        data[key] = {"topology": topo.fingerprint, "params": asdict(params)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=2))
+        tmp.replace(self.path)
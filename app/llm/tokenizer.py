@@ -0,0 +1,208 @@
+# app/llm/tokenizer.py
+"""
+Per-model token counting for context budgeting and accounting.
+
+Backends: llama-server's /tokenize (the runtime's own vocabulary) or a local Hugging Face
+tokenizer. Concurrent lookups are coalesced into micro-batches, identical texts are
+tokenized once, and counts are memoized in an LRU keyed by a digest of the text. Repeated
+segments such as a system prompt therefore cost a dict lookup.
+"""
+from __future__ import annotations
+import asyncio, hashlib, logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .base import ChatRequest
+
+if TYPE_CHECKING:
+    import httpx
+    from .registry import ModelEntry
+
+log = logging.getLogger(__name__)
+
+
+class ContextOverflow(Exception):
+    def __init__(self, prompt_tokens: int, context: int, min_output: int):
+        self.prompt_tokens, self.context, self.min_output = prompt_tokens, context, min_output
+        super().__init__(f"Prompt is {prompt_tokens} tokens; context is {context} "
+                         f"(at least {min_output} must be left for the reply)")
+
+
+class LlamaServerBackend:
+    def __init__(self, base_url: str, concurrency: int = 8):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            import httpx
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=10.0)
+            self._sem = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def _one(self, text: str) -> List[int]:
+        client = self._http()
+        async with self._sem:
+            r = await client.post("/tokenize", json={"content": text, "add_special": False})
+        r.raise_for_status()
+        return r.json()["tokens"]
+
+    async def encode(self, texts: Sequence[str]) -> List[List[int]]:
+        # /tokenize takes one string; a batch goes out concurrently over one keep-alive pool
+        return list(await asyncio.gather(*(self._one(t) for t in texts)))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class HFBackend:
+    def __init__(self, path: str):
+        self.path = path
+        self._tok = None
+
+    def _encode(self, texts: Sequence[str]) -> List[List[int]]:
+        if self._tok is None:
+            from transformers import AutoTokenizer  # deferred: heavy import
+            self._tok = AutoTokenizer.from_pretrained(self.path)
+        return self._tok(list(texts), add_special_tokens=False)["input_ids"]
+
+    async def encode(self, texts: Sequence[str]) -> List[List[int]]:
+        return await asyncio.to_thread(self._encode, texts)
+
+    async def close(self) -> None:
+        return None
+
+
+def _key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class Tokenizer:
+    def __init__(self, backend, overhead: int = 16, cache_size: int = 4096,
+                 max_batch: int = 64, batch_window_ms: float = 2.0):
+        self.backend = backend
+        self.overhead = overhead          # chat-template tokens added around system + prompt
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000.0
+        self._cache: OrderedDict[bytes, int] = OrderedDict()
+        self._pending: Dict[bytes, asyncio.Future] = {}   # queued or in flight
+        self._queue: List[Tuple[bytes, str]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._running: set = set()   # strong refs to full-batch flushes
+        self.hits = self.misses = 0
+
+    def _remember(self, key: bytes, n: int) -> None:
+        self._cache[key] = n
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        key = _key(text)
+        n = self._cache.get(key)
+        if n is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return n
+        self.misses += 1
+        fut = self._pending.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._pending[key] = fut
+            self._queue.append((key, text))
+            if len(self._queue) >= self.max_batch:
+                task = asyncio.create_task(self._run(self._take()))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            elif self._flusher is None:
+                self._flusher = asyncio.create_task(self._flush_later())
+        # shield: one caller going away must not cancel the lookup others are waiting on
+        return await asyncio.shield(fut)
+
+    async def count_many(self, texts: Sequence[Optional[str]]) -> List[int]:
+        return list(await asyncio.gather(*(self.count(t) for t in texts)))
+
+    async def encode(self, text: str) -> List[int]:
+        """Token ids (uncached; counts are); for /api/tokenize."""
+        ids = (await self.backend.encode([text]))[0]
+        self._remember(_key(text), len(ids))
+        return ids
+
+    def _take(self) -> List[Tuple[bytes, str]]:
+        batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        return batch
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        self._flusher = None
+        while self._queue:
+            await self._run(self._take())
+
+    async def _run(self, batch: List[Tuple[bytes, str]]) -> None:
+        if not batch:
+            return
+        try:
+            ids = await self.backend.encode([t for _, t in batch])
+        except Exception as e:
+            for key, _ in batch:
+                fut = self._pending.pop(key, None)
+                if fut is not None and not fut.done():
+                    fut.set_exception(e)
+            return
+        for (key, _), toks in zip(batch, ids):
+            self._remember(key, len(toks))
+            fut = self._pending.pop(key, None)
+            if fut is not None and not fut.done():
+                fut.set_result(len(toks))
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+@dataclass
+class Budget:
+    prompt_tokens: int      # system + prompt + template overhead
+    max_tokens: int         # reply budget after trimming to the context
+    trimmed: bool
+
+
+async def fit_context(tok: Tokenizer, context: int, system: Optional[str], prompt: str,
+                      max_tokens: int, min_output: int) -> Budget:
+    """Count the request and shrink max_tokens so prompt + reply fit the context;
+    raises ContextOverflow if not even `min_output` tokens would be left."""
+    sys_n, prompt_n = await tok.count_many([system, prompt])
+    used = sys_n + prompt_n + tok.overhead
+    room = context - used
+    if room < min_output:
+        raise ContextOverflow(used, context, min_output)
+    return Budget(prompt_tokens=used, max_tokens=min(max_tokens, room), trimmed=max_tokens > room)
+
+
+async def budget_request(entry: ModelEntry, req: ChatRequest, min_output: int) -> Tuple[ChatRequest, Optional[Budget]]:
+    """Fit `req` to the model's context before dispatch (max_tokens trimmed or filled in).
+    Raises ContextOverflow; if the tokenizer is unreachable the request goes out unchecked."""
+    if not (entry.tokenizer and entry.context):
+        return req, None
+    requested = {**entry.provider.defaults, **(req.llm_params or {})}.get("max_tokens")
+    try:
+        budget = await fit_context(entry.tokenizer, entry.context, req.system, req.prompt,
+                                   int(requested) if requested else entry.context, min_output)
+    except ContextOverflow:
+        raise
+    except Exception as e:
+        log.warning("token budgeting for %s skipped: %s", entry.name, e)
+        return req, None
+    if budget.trimmed or not requested:
+        req = req.model_copy(update={"llm_params": {**(req.llm_params or {}), "max_tokens": budget.max_tokens}})
+    return req, budget
@@ -1,14 +1,19 @@
 # app/main.py
 
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from pathlib import Path
 
+from .assets import PrecompressedStaticFiles, IndexCache
 from .config import settings
 from .db import Base, engine
-from .routers import uploads, chats, auth
+from .metrics import render as render_metrics, publisher as metrics_publisher, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .middleware import ObservabilityMiddleware
+from .batch import runner as batch_runner
+from .routers import uploads, chats, auth, admin, batch, ws
 from .routers.auth import get_current_user, AuthUser
 from .routers import generate  # /api/models, /api/generate
 
@@ -18,10 +23,37 @@ try:
 except ImportError:
     from .registry import registry  # fallback if your layout is app/registry.py
 
-# --- DB init ---
-Base.metadata.create_all(engine)
+# --- Lifecycle: schema, upload dir + sweeper, models.yaml runtimes/providers ---
+# Nothing here runs at import time, so worker spawns and --reload stay cheap.
+# Under `python -m app.serve` (APP_ROLE=worker) schema and sweeper belong to the owner
+# process and the registry only builds provider clients (see app/serve.py).
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker = settings.APP_ROLE == "worker"
+    sweeper = metrics = None
+    if worker:
+        metrics = asyncio.create_task(metrics_publisher())  # /metrics sums every process
+    if not worker:
+        await asyncio.to_thread(Base.metadata.create_all, engine)
+        uploads.BASE.mkdir(parents=True, exist_ok=True)
+        sweeper = asyncio.create_task(uploads.sweeper_task())
+    # Load model registry (models.yaml at repo root)
+    registry.load("models.yaml")
+    await registry.startup()
+    registry.watch(settings.MODELS_RELOAD_INTERVAL)  # edits to models.yaml apply without a restart
+    batch_runner.start()  # /api/batch jobs, at low priority next to interactive traffic
+    try:
+        yield
+    finally:
+        await batch_runner.stop()
+        if sweeper:
+            sweeper.cancel()
+        await registry.shutdown()
+        if metrics:
+            metrics.cancel()
+            await asyncio.gather(metrics, return_exceptions=True)
 
-app = FastAPI(title="WarriorGPT")
+app = FastAPI(title="WarriorGPT", lifespan=lifespan)
 
 # --- CORS ---
 app.add_middleware(
@@ -31,23 +63,30 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ObservabilityMiddleware)  # outermost: latency covers CORS + app
 
 # Routers
 app.include_router(auth.router)     # /auth/*
 app.include_router(uploads.router)  # /files/*
 app.include_router(chats.router)    # /chat/*
 app.include_router(generate.router) # /api/models, /api/generate (proxy via registry)
+app.include_router(admin.router)    # /admin/runtimes (supervisor state + telemetry)
+app.include_router(batch.router)    # /api/batch (offline JSONL jobs, run in the background)
+app.include_router(ws.router)       # /api/ws (multiplexed generation over one WebSocket)
 
 # --- Static & index ---
+# `python -m app.assets build` fingerprints + precompresses into static/dist/ (see run.sh);
+# without a build, or with STATIC_DIST off (dev), the raw files are served as before.
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
 if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory=str(STATIC_DIR)), name="static")
+INDEX = IndexCache(STATIC_DIR, use_dist=settings.STATIC_DIST)
 
 @app.get("/")
-def root():
-    index = STATIC_DIR / "index.html"
-    if index.exists():
-        return FileResponse(index)
+def root(request: Request):
+    resp = INDEX.response(request)
+    if resp is not None:
+        return resp
     return {"ok": True, "hint": "Place your UI at static/index.html or open /static/index.html"}
 
 @app.get("/favicon.ico")
@@ -62,18 +101,13 @@ def favicon():
 def health():
     return {"ok": True}
 
+# --- Prometheus scrape ---
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # multi-process: reads (and refreshes) the shared store, so off the event loop
+    return Response(await asyncio.to_thread(render_metrics), media_type=METRICS_CONTENT_TYPE)
+
 # --- Who am I (used by the UI header) ---
 @app.get("/me")
 def me(user: AuthUser = Depends(get_current_user)):
     return {"user": user}
-
-# --- Lifecycle: load models.yaml, start/stop runtimes/providers ---
-@app.on_event("startup")
-async def _startup():
-    # Load model registry (models.yaml at repo root)
-    registry.load("models.yaml")
-    await registry.startup()
-
-@app.on_event("shutdown")
-async def _shutdown():
-    await registry.shutdown()
@@ -0,0 +1,281 @@
+# app/metrics.py
+"""
+Minimal Prometheus text-format metrics (no client dependency).
+
+Children are created once per label set and cached, so the hot path is a dict lookup,
+a bisect and two additions under a per-child lock.
+
+Under `python -m app.serve` every process counts on its own. Each one publishes a dump() of
+its values to the shared store (publisher()), and collect() sums the dumps of all processes,
+so a scrape of any worker sees the whole deployment. A process that exits leaves its last
+dump behind, so totals never go backwards; the launcher clears them on start.
+"""
+from __future__ import annotations
+import asyncio, json, os, socket, threading, time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_GAP_BUCKETS = (.001, .0025, .005, .01, .02, .035, .05, .075, .1, .15, .25, .5, 1)
+TTFT_BUCKETS = (.025, .05, .1, .25, .5, .75, 1, 2, 5, 10, 30)
+DB_BUCKETS = (.0001, .0005, .001, .0025, .005, .01, .025, .05, .1, .5, 1)
+DECODE_RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200, 400)
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labelstr(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def get(self, *values: str):
+        """Existing child for a label set, or None (unlike labels(), never creates one)."""
+        return self._children.get(tuple(str(v) for v in values))
+
+    def _child(self):
+        raise NotImplementedError
+
+    def dump(self) -> Dict[str, Any]:
+        """{label values as a JSON list: value} for every child (JSON-ready)."""
+        return {json.dumps(key): self._value(child) for key, child in list(self._children.items())}
+
+    def render(self, values: Dict[str, Any]) -> List[str]:
+        out = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in values.items():
+            out.extend(self._render_child(tuple(json.loads(key)), value))
+        return out
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    @staticmethod
+    def _value(child: _CounterChild) -> float:
+        return child.value
+
+    @staticmethod
+    def _merge(a: float, b: float) -> float:
+        return a + b
+
+    def _render_child(self, key, value):
+        return [f"{self.name}_total{_labelstr(self.labelnames, key)} {_fmt(value)}"]
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last slot = +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, v: float) -> None:
+        i = bisect_left(self.bounds, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "t0")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.t0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Iterable[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labelnames)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, v: float) -> None:
+        self.labels().observe(v)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    @staticmethod
+    def _value(child: _HistogramChild) -> List[float]:
+        with child._lock:
+            return [*child.counts, child.sum]   # bucket counts (last = +Inf), then the sum
+
+    @staticmethod
+    def _merge(a: List[float], b: List[float]) -> List[float]:
+        return [x + y for x, y in zip(a, b)]
+
+    def _render_child(self, key, value):
+        counts, total = value[:-1], value[-1]
+        out, cum = [], 0
+        for bound, n in zip((*self.buckets, float("inf")), counts):
+            cum += n
+            le = 'le="%s"' % _fmt(bound)
+            out.append(f"{self.name}_bucket{_labelstr(self.labelnames, key, le)} {cum}")
+        out.append(f"{self.name}_sum{_labelstr(self.labelnames, key)} {_fmt(total)}")
+        out.append(f"{self.name}_count{_labelstr(self.labelnames, key)} {cum}")
+        return out
+
+
+REGISTRY: List[_Metric] = []
+
+Dump = Dict[str, Dict[str, Any]]   # metric name -> Metric.dump()
+
+
+def dump() -> Dump:
+    return {m.name: m.dump() for m in REGISTRY}
+
+
+def merge(dumps: Iterable[Dump]) -> Dump:
+    kinds = {m.name: m for m in REGISTRY}
+    out: Dump = {}
+    for d in dumps:
+        for name, values in d.items():
+            m = kinds.get(name)
+            if m is None:
+                continue   # dumped by a process running other code
+            into = out.setdefault(name, {})
+            for key, v in values.items():
+                into[key] = m._merge(into[key], v) if key in into else v
+    return out
+
+
+def value(data: Dump, metric: _Metric, *labels: str) -> Any:
+    """One child's value from dump()/collect() data, or None."""
+    return data.get(metric.name, {}).get(json.dumps([str(v) for v in labels]))
+
+
+# --- multi-process aggregation (see app/serve.py) ---
+
+_STORE_PREFIX = "metrics:"
+
+
+def _multiprocess() -> bool:
+    from .config import settings
+    return settings.APP_ROLE != "all"
+
+
+def _publish() -> None:
+    from .shared import store
+    store.set(f"{_STORE_PREFIX}{socket.gethostname()}:{os.getpid()}", dump())
+
+
+def collect() -> Dump:
+    """Values for the whole deployment: this process's own, or (multi-process) all processes' summed."""
+    if not _multiprocess():
+        return dump()
+    from .shared import store
+    _publish()   # ours fresh; the others are at most one publisher interval old
+    return merge(store.scan(_STORE_PREFIX).values())
+
+
+def clear_published() -> None:
+    from .shared import store
+    store.delete_prefix(_STORE_PREFIX)
+
+
+async def publisher(interval: float = 1.0) -> None:
+    """Keep this process's dump in the shared store; a final one is written on cancel."""
+    try:
+        while True:
+            await asyncio.to_thread(_publish)
+            await asyncio.sleep(interval)
+    finally:
+        _publish()
+
+
+def render(data: Optional[Dump] = None) -> str:
+    data = collect() if data is None else data
+    lines: List[str] = []
+    for m in REGISTRY:
+        lines.extend(m.render(data.get(m.name, {})))
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- application metrics ---
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency until the last body byte.",
+                         ["method", "route", "status"])
+LLM_TTFT = Histogram("llm_time_to_first_token_seconds", "Time from request accepted to first streamed token.",
+                     ["model"], buckets=TTFT_BUCKETS)
+LLM_TOKEN_GAP = Histogram("llm_inter_token_seconds", "Gap between consecutive streamed tokens.",
+                          ["model"], buckets=TOKEN_GAP_BUCKETS)
+LLM_TOKENS = Counter("llm_tokens_generated", "Streamed token chunks.", ["model"])
+LLM_PROMPT_TOKENS = Counter("llm_prompt_tokens", "Prompt tokens (system + prompt + template) accepted by /api/generate.", ["model"])
+LLM_DISPATCH = Histogram("llm_dispatch_seconds", "Time from request accepted to upstream dispatch (readiness check, context budgeting).",
+                         ["model"], buckets=TTFT_BUCKETS)
+LLM_QUEUE_WAIT = Histogram("llm_queue_wait_seconds", "Time a batch item waits before dispatch (BATCH_CONCURRENCY slot, model readiness, interactive streams).",
+                           ["model"], buckets=TTFT_BUCKETS)
+LLM_DECODE_RATE = Histogram("llm_decode_tokens_per_second", "Per-response decode speed reported by the backend (llama-server timings).",
+                            ["model"], buckets=DECODE_RATE_BUCKETS)
+LLM_DRAFT_TOKENS = Counter("llm_draft_tokens", "Speculative decoding draft tokens, by result (drafted / accepted).",
+                           ["model", "result"])
+BATCH_ITEMS = Counter("llm_batch_items", "Batch job items finished, by result (ok / error).", ["model", "result"])
+DB_QUERY = Histogram("db_query_seconds", "SQL statement execution time.", buckets=DB_BUCKETS)
+DB_SESSION = Histogram("db_session_seconds", "Lifetime of a get_db session.", buckets=DB_BUCKETS)
+UPLOAD_BYTES = Counter("upload_bytes", "Bytes accepted by /files/upload.")
+SWEEPER_RUNS = Counter("upload_sweeper_runs", "Completed upload sweeper passes.")
+SWEEPER_SECONDS = Histogram("upload_sweeper_seconds", "Duration of an upload sweeper pass.")
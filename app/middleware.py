@@ -0,0 +1,40 @@
+# app/middleware.py
+from __future__ import annotations
+from time import perf_counter
+
+from .metrics import HTTP_LATENCY
+from .tracing import span
+
+
+class ObservabilityMiddleware:
+    """Pure ASGI (no BaseHTTPMiddleware body buffering): per-route latency histogram
+    measured to the last body byte, plus an optional request span."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        t0 = perf_counter()
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        with span(f"HTTP {method}", {"http.method": method, "http.target": scope["path"]}) as sp:
+            try:
+                await self.app(scope, receive, _send)
+            finally:
+                # route template (not the raw path) keeps label cardinality bounded
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                HTTP_LATENCY.labels(method, route, status).observe(perf_counter() - t0)
+                if sp is not None:
+                    sp.update_name(f"{method} {route}")
+                    sp.set_attribute("http.route", route)
+                    sp.set_attribute("http.status_code", status)
@@ -1,6 +1,6 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, func, Index
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, func, Index
 from .db import Base
 
 class User(Base):
@@ -18,3 +18,19 @@ class Chat(Base):
     messages_jsonl = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     __table_args__ = (Index("ix_chats_user_created", "user_id", "created_at"),)
+
+class BatchJob(Base):
+    __tablename__ = "batch_jobs"
+    id = Column(String, primary_key=True)             # uuid hex; names the input/result files in BATCH_DIR
+    user_id = Column(Integer, index=True, nullable=False)
+    model = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued|running|completed|failed|cancelled
+    total = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)          # items with a result line (incl. failed)
+    failed = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    runner = Column(String, nullable=True)            # "<host>:<pid>" of the process running it
+    heartbeat = Column(Float, nullable=True)          # epoch seconds; stale => requeued
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__ = (Index("ix_batch_jobs_status", "status"),)
@@ -0,0 +1,30 @@
+# app/routers/admin.py
+from __future__ import annotations
+from fastapi import APIRouter, Depends, HTTPException
+from ..llm.registry import registry
+from .auth import require_admin, AuthUser
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# async: registry and supervisor state belong to the event loop (asyncio objects aren't
+# thread-safe), so these must not run in the threadpool a sync handler would get
+
+@router.get("/runtimes")
+async def list_runtimes(user: AuthUser = Depends(require_admin)):
+    # liveness, restart counters, /proc samples and llama-server /metrics + /slots
+    return await registry.snapshots()
+
+@router.post("/runtimes/{name}/restart")
+async def restart_runtime(name: str, user: AuthUser = Depends(require_admin)):
+    # in multi-worker mode this is queued for the runtime owner process
+    if not await registry.restart_runtime(name):
+        raise HTTPException(404, f"No supervised runtime for model: {name}")
+    return {"ok": True}
+
+@router.post("/models/reload")
+async def reload_models(user: AuthUser = Depends(require_admin)):
+    # diff models.yaml against the running models; returns once the swap is live (drains continue)
+    try:
+        return await registry.reload_everywhere()
+    except (OSError, ValueError, KeyError) as e:
+        raise HTTPException(400, f"models.yaml not applied: {e.__class__.__name__}: {e}")
@@ -6,32 +6,34 @@ from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, Field
-from passlib.hash import argon2
-from jose import jwt, JWTError
 from sqlalchemy import select, update
-from collections import defaultdict
-from time import time
 
 from ..db import get_db
 from ..models import User
 from ..config import settings
+from ..shared import store
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 # === helpers ===
 COOKIE = "access_token"
 
+# passlib/argon2 and jose/cryptography are imported on first use: they dominate
+# import time and most worker spawns (and /healthz probes) never touch them.
 def hash_pw(pw: str) -> str:
+    from passlib.hash import argon2
     # Argon2id; passlib handles salt & params
     return argon2.using(rounds=3).hash(pw)
 
 def verify_pw(pw: str, ph: str) -> bool:
+    from passlib.hash import argon2
     try:
         return argon2.verify(pw, ph)
     except Exception:
         return False
 
 def make_access_token(sub: str) -> str:
+    from jose import jwt
     now = datetime.now(timezone.utc)
     exp = now + timedelta(days=settings.ACCESS_TOKEN_DAYS)
     payload = {"sub": sub, "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
@@ -47,18 +49,14 @@ def set_cookie(resp: Response, token: str):
 def clear_cookie(resp: Response):
     resp.delete_cookie(COOKIE, path="/")
 
-# --- brute-force throttle (dev-grade; move to Redis in prod) ---
-FAILS = defaultdict(list)
+# --- brute-force throttle (shared by all workers via app.shared) ---
 MAX_FAILS, WINDOW = 5, 15 * 60
 
 def record_fail(key: str):
-    now = time()
-    FAILS[key] = [t for t in FAILS[key] if now - t < WINDOW] + [now]
+    store.hit(f"login_fail:{key}", WINDOW)
 
 def too_many(key: str) -> bool:
-    now = time()
-    FAILS[key] = [t for t in FAILS[key] if now - t < WINDOW]
-    return len(FAILS[key]) >= MAX_FAILS
+    return store.count(f"login_fail:{key}", WINDOW) >= MAX_FAILS
 
 # === schemas ===
 class RegisterIn(BaseModel):
@@ -111,7 +109,11 @@ def logout(response: Response):
 
 # --- guard dependency ---
 def get_current_user(request: Request, db=Depends(get_db)) -> AuthUser:
-    tok = request.cookies.get(COOKIE)
+    return user_from_token(request.cookies.get(COOKIE), db)
+
+def user_from_token(tok: Optional[str], db) -> AuthUser:
+    """Resolve an access-token cookie; also used by /api/ws, where dependencies can't answer 401."""
+    from jose import jwt, JWTError
     if not tok:
         raise HTTPException(401, "Not authenticated")
     try:
@@ -124,6 +126,12 @@ def get_current_user(request: Request, db=Depends(get_db)) -> AuthUser:
         raise HTTPException(401, "User not found")
     return AuthUser(id=u.id, email=u.email)
 
+def require_admin(user: AuthUser = Depends(get_current_user)) -> AuthUser:
+    # registration is open, so being logged in is not enough for /admin/*
+    if user.email.lower() not in {e.lower() for e in settings.ADMIN_EMAILS}:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin only")
+    return user
+
 # === password reset (signed, short-lived JWT token) ===
 class ResetRequestIn(BaseModel):
     email: EmailStr
@@ -135,6 +143,7 @@ class ResetRequestOut(BaseModel):
 
 @router.post("/request_password_reset", response_model=ResetRequestOut)
 def request_password_reset(payload: ResetRequestIn, db=Depends(get_db)):
+    from jose import jwt
     email = payload.email.lower()
     u = db.scalar(select(User).where(User.email == email))
     # Always respond ok; only include token if user exists (avoid user enumeration)
@@ -156,6 +165,7 @@ class ResetPasswordIn(BaseModel):
 
 @router.post("/reset_password")
 def reset_password(payload: ResetPasswordIn, db=Depends(get_db)):
+    from jose import jwt, JWTError
     try:
         data = jwt.decode(payload.token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGO])
         if data.get("typ") != "pwd_reset":
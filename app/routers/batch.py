@@ -0,0 +1,142 @@
+# app/routers/batch.py
+"""
+Offline batch generation. POST a JSONL file with one ChatRequest per line, plus an optional
+"id" that is echoed back. Items run in the background (app/batch.py), and the results can be
+fetched as JSONL while the job is still running.
+"""
+from __future__ import annotations
+import asyncio, json, uuid
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, select, update
+
+from ..batch import BASE, TERMINAL, input_path, result_path
+from ..config import settings
+from ..db import SessionLocal, get_db
+from ..llm.base import ChatRequest
+from ..llm.registry import registry
+from ..models import BatchJob
+from .auth import get_current_user, AuthUser
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+
+def _job(db, job_id: str, user: AuthUser) -> BatchJob:
+    job = db.get(BatchJob, job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(404, "Not found")
+    return job
+
+
+def _out(job: BatchJob) -> dict:
+    return {
+        "id": job.id, "model": job.model, "status": job.status, "total": job.total,
+        "done": job.done, "failed": job.failed, "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@router.post("")
+def submit(file: UploadFile = File(...),
+           model: str | None = Query(default=None, description="Model name from /api/models"),
+           db=Depends(get_db),
+           user: AuthUser = Depends(get_current_user)):
+    name = model or next(iter(registry.models.keys()), None)
+    if name not in registry.models:
+        raise HTTPException(404, f"Model not found: {name}")
+
+    # validate every line up front and store a normalized copy; line i of it is item i
+    BASE.mkdir(parents=True, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    dest = input_path(job_id)
+    maxb = settings.BATCH_MAX_MB * 1024**2
+    size = total = 0
+    try:
+        with dest.open("w") as out:
+            for lineno, raw in enumerate(file.file, 1):
+                size += len(raw)
+                if size > maxb:
+                    raise HTTPException(413, f"File too large. Limit {settings.BATCH_MAX_MB} MB")
+                if not raw.strip():
+                    continue
+                try:
+                    item = json.loads(raw)
+                    req = ChatRequest.model_validate(item)
+                except (ValueError, ValidationError) as e:
+                    raise HTTPException(400, f"Line {lineno}: {e}")
+                rec = req.model_dump()
+                if item.get("id") is not None:
+                    rec["id"] = item["id"]
+                out.write(json.dumps(rec) + "\n")
+                total += 1
+        if not total:
+            raise HTTPException(400, "No requests in file")
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+
+    job = BatchJob(id=job_id, user_id=user.id, model=name, status="queued", total=total)
+    db.add(job); db.commit()
+    return _out(job)
+
+
+@router.get("")
+def list_jobs(db=Depends(get_db), user: AuthUser = Depends(get_current_user)):
+    rows = db.scalars(select(BatchJob).where(BatchJob.user_id == user.id)
+                      .order_by(BatchJob.created_at.desc())).all()
+    return [_out(j) for j in rows]
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, db=Depends(get_db), user: AuthUser = Depends(get_current_user)):
+    return _out(_job(db, job_id, user))
+
+
+@router.post("/{job_id}/cancel")
+def cancel_job(job_id: str, db=Depends(get_db), user: AuthUser = Depends(get_current_user)):
+    job = _job(db, job_id, user)
+    # the runner sees the status on its next heartbeat and aborts in-flight items
+    db.execute(update(BatchJob).where(BatchJob.id == job.id, BatchJob.status.not_in(TERMINAL))
+               .values(status="cancelled", finished_at=func.now()))
+    db.commit()
+    db.refresh(job)
+    return _out(job)
+
+
+@router.get("/{job_id}/results")
+def results(job_id: str,
+            follow: bool = Query(default=False, description="Keep streaming until the job finishes"),
+            db=Depends(get_db),
+            user: AuthUser = Depends(get_current_user)):
+    _job(db, job_id, user)
+    path = result_path(job_id)
+
+    def status() -> str:
+        with SessionLocal() as s:
+            return s.scalar(select(BatchJob.status).where(BatchJob.id == job_id))
+
+    async def stream():
+        pos, buf = 0, b""
+        while True:
+            # a check before the read: once terminal, one more read gets every line
+            finished = not follow or await asyncio.to_thread(status) in TERMINAL
+            if path.exists():
+                if path.stat().st_size < pos:
+                    pos, buf = path.stat().st_size, b""   # torn tail truncated by a resuming runner
+                with path.open("rb") as f:
+                    f.seek(pos)
+                    chunk = f.read()
+                pos += len(chunk)
+                buf += chunk
+                # complete lines only; a line being appended right now comes next round
+                head, sep, buf = buf.rpartition(b"\n")
+                if sep:
+                    yield head + sep
+            if finished:
+                return
+            await asyncio.sleep(settings.BATCH_POLL_INTERVAL / 2)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{job_id}.jsonl"'})
@@ -1,35 +1,135 @@
 # app/routers/generate.py (new)
 from __future__ import annotations
+from contextlib import AsyncExitStack
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from ..llm.registry import registry
+from pydantic import BaseModel
+from time import perf_counter
+from typing import Optional
+from ..config import settings
+from ..llm.registry import registry, ModelEntry
 from ..llm.base import ChatRequest
+from ..llm.tokenizer import ContextOverflow, budget_request
+from ..metrics import LLM_TTFT, LLM_TOKEN_GAP, LLM_TOKENS, LLM_DISPATCH, LLM_PROMPT_TOKENS
+from ..tracing import span
 # If you want auth: from .auth import get_current_user, AuthUser
 
 router = APIRouter(tags=["llm"])
 
+
+class LeasedStreamingResponse(StreamingResponse):
+    """StreamingResponse that releases a model lease once the response is done or aborted.
+    (Releasing in the body generator would miss a client that disconnects before it starts.)"""
+
+    def __init__(self, release, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._release()
+
+
 @router.get("/api/models")
 def list_models():
     return [
-        {"name": e.name, "display_name": e.display_name, "type": e.type}
+        {"name": e.name, "display_name": e.display_name, "type": e.type, "status": registry.status(e.name)}
         for e in registry.models.values()
     ]
 
+def _entry(model: str | None) -> tuple[str, ModelEntry]:
+    try:
+        name = model or next(iter(registry.models.keys()))
+        return name, registry.entry(name)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+class TokenizeRequest(BaseModel):
+    prompt: str
+    system: Optional[str] = None
+    ids: bool = False   # also return the prompt's token ids
+
+
+@router.post("/api/tokenize")
+async def tokenize(req: TokenizeRequest, model: str | None = Query(default=None)):
+    name, entry = _entry(model)
+    tok = entry.tokenizer
+    if tok is None:
+        raise HTTPException(404, f"Model {name} has no tokenizer configured")
+    try:
+        if req.ids:
+            ids = await tok.encode(req.prompt)
+            sys_n, prompt_n = await tok.count(req.system), len(ids)
+        else:
+            sys_n, prompt_n = await tok.count_many([req.system, req.prompt])
+    except Exception as e:
+        raise HTTPException(503, f"Tokenizer for {name} unavailable: {e.__class__.__name__}: {e}")
+    total = sys_n + prompt_n + tok.overhead
+    out = {
+        "model": name, "system_tokens": sys_n, "prompt_tokens": prompt_n, "template_tokens": tok.overhead,
+        "total_tokens": total, "context": entry.context,
+        "max_reply_tokens": entry.context - total if entry.context else None,
+    }
+    if req.ids:
+        out["ids"] = ids
+    return out
+
+
 @router.post("/api/generate")
 async def generate(
     req: ChatRequest,
     model: str | None = Query(default=None, description="Model name from /api/models"),
     # user: AuthUser = Depends(get_current_user)  # uncomment if you want auth
 ):
-    # choose provider
+    # choose provider; the entry (not the name) is held for the whole stream, so a
+    # models.yaml reload mid-stream doesn't switch provider or runtime under it
+    provider_name, entry = _entry(model)
+    # leased from here, not from the first body iteration: a reload landing in between
+    # would otherwise see no stream and shut the provider/runtime down under this request
+    lease = AsyncExitStack()
+    provider = await lease.enter_async_context(entry.lease())
     try:
-        provider_name = model or next(iter(registry.models.keys()))
-        provider = registry.get(provider_name)
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        return await _generate(req, provider_name, entry, provider, lease)
+    except BaseException:
+        await lease.aclose()
+        raise
+
+
+async def _generate(req: ChatRequest, provider_name: str, entry: ModelEntry, provider, lease: AsyncExitStack):
+    accepted = perf_counter()
+    if not registry.is_ready(provider_name):
+        # runtime still loading (or failed); other models keep serving
+        raise HTTPException(status_code=503, detail=f"Model {provider_name} is {registry.status(provider_name)}")
+
+    headers = {}
+    # budget before dispatch: overflow fails here instead of after a backend round-trip
+    try:
+        req, budget = await budget_request(entry, req, settings.TOKEN_MIN_OUTPUT)
+    except ContextOverflow as e:
+        raise HTTPException(413, {"error": str(e), "prompt_tokens": e.prompt_tokens, "context": e.context})
+    if budget:
+        LLM_PROMPT_TOKENS.labels(provider_name).inc(budget.prompt_tokens)
+        headers = {"X-Prompt-Tokens": str(budget.prompt_tokens), "X-Max-Tokens": str(budget.max_tokens)}
+    ttft, gap = LLM_TTFT.labels(provider_name), LLM_TOKEN_GAP.labels(provider_name)
 
     async def stream():
-        async for chunk in provider.stream_chat(req):
-            yield chunk
+        LLM_DISPATCH.labels(provider_name).observe(perf_counter() - accepted)
+        last, n = None, 0
+        try:
+            with span("llm.generate", {"llm.model": provider_name}):
+                async for chunk in provider.stream_chat(req):
+                    now = perf_counter()
+                    if last is None:
+                        ttft.observe(now - accepted)
+                    else:
+                        gap.observe(now - last)
+                    last = now
+                    n += 1
+                    yield chunk
+        finally:
+            LLM_TOKENS.labels(provider_name).inc(n)
 
-    return StreamingResponse(stream(), media_type="text/plain")
+    return LeasedStreamingResponse(lease.aclose, stream(), media_type="text/plain", headers=headers)
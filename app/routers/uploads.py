@@ -5,6 +5,7 @@ from typing import List, Optional
 from pathlib import Path
 import time, uuid, asyncio, imghdr, os
 from ..config import settings
+from ..metrics import UPLOAD_BYTES, SWEEPER_RUNS, SWEEPER_SECONDS
 from .auth import get_current_user, AuthUser
 
 router = APIRouter(prefix="/files", tags=["uploads"])
@@ -12,8 +13,7 @@ router = APIRouter(prefix="/files", tags=["uploads"])
 SID_COOKIE = "sid"
 ALLOWED_MIME = {"image/png","image/jpeg","image/webp","image/gif","application/pdf"}
 
-BASE = Path(settings.UPLOADS_DIR)
-BASE.mkdir(parents=True, exist_ok=True)
+BASE = Path(settings.UPLOADS_DIR)  # created in the app lifespan (see app.main)
 
 def get_sid(req: Request, res: Response) -> str:
     sid = req.cookies.get(SID_COOKIE)
@@ -48,6 +48,7 @@ def trim_global_cap():
 
 async def sweeper_task():
     while True:
+        t0 = time.perf_counter()
         cutoff = time.time() - settings.UPLOAD_TTL_SECONDS
         for d in BASE.rglob("*"):
             if not d.is_dir():
@@ -64,12 +65,10 @@ async def sweeper_task():
             except Exception:
                 pass
         trim_global_cap()
+        SWEEPER_SECONDS.observe(time.perf_counter() - t0)
+        SWEEPER_RUNS.inc()
         await asyncio.sleep(600)
 
-@router.on_event("startup")
-async def start_sweeper():
-    asyncio.create_task(sweeper_task())
-
 @router.post("/upload")
 async def upload(req: Request, res: Response,
                  files: List[UploadFile] = File(...),
@@ -105,6 +104,7 @@ async def upload(req: Request, res: Response,
                     raise HTTPException(413, f"Session quota exceeded. Limit {settings.SESSION_CAP_MB} MB")
                 out.write(chunk)
         current += size
+        UPLOAD_BYTES.inc(size)
 
         if f.content_type.startswith("image/"):
             if imghdr.what(dest) is None:
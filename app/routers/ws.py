@@ -0,0 +1,224 @@
+# app/routers/ws.py
+"""
+/api/ws: several generations multiplexed over one authenticated WebSocket.
+
+Frames are compact JSON text messages tagged by "t"; every stream frame carries the
+client-chosen stream "id".
+
+    client -> server
+      {"t":"gen","id":"a","model":"m","prompt":"...","system":"...","llm_params":{...}}
+      {"t":"cancel","id":"a"}          abort the upstream call
+      {"t":"ack","n":4096}             bytes of delta frames consumed (flow control)
+    server -> client
+      {"t":"delta","id":"a","d":"text"}
+      {"t":"usage","id":"a","prompt_tokens":..,"completion_tokens":..,"chunks":..,"ttft_ms":..,"ms":..}
+      {"t":"done","id":"a","reason":"stop"|"cancelled"}
+      {"t":"error","id":"a","code":413,"msg":"..."}
+
+Flow control: the server stops sending delta frames once WS_WINDOW_BYTES are unacknowledged.
+Streams waiting for credit stop reading from upstream, so a slow client holds at most a
+window of output in server memory. Control frames (usage/done/error) bypass the window.
+"""
+from __future__ import annotations
+import asyncio, json, logging
+from time import perf_counter
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from ..config import settings
+from ..db import SessionLocal
+from ..llm.base import ChatRequest
+from ..llm.registry import registry
+from ..llm.tokenizer import ContextOverflow, budget_request
+from ..metrics import LLM_TTFT, LLM_TOKEN_GAP, LLM_TOKENS, LLM_DISPATCH, LLM_PROMPT_TOKENS
+from ..tracing import span
+from .auth import COOKIE, AuthUser, user_from_token
+
+router = APIRouter(tags=["llm"])
+log = logging.getLogger(__name__)
+
+# WebSocket close codes
+POLICY_VIOLATION = 1008
+
+
+def _origin_ok(ws: WebSocket) -> bool:
+    # cookie auth + WebSockets = cross-site hijacking unless the Origin is checked (CORS doesn't apply)
+    origin = ws.headers.get("origin")
+    if not origin or "*" in settings.CORS_ORIGINS or origin in settings.CORS_ORIGINS:
+        return True
+    return urlsplit(origin).netloc == ws.headers.get("host")
+
+
+def _auth(ws: WebSocket) -> Optional[AuthUser]:
+    with SessionLocal() as db:
+        try:
+            return user_from_token(ws.cookies.get(COOKIE), db)
+        except HTTPException:
+            return None
+
+
+class _Conn:
+    def __init__(self, ws: WebSocket, window: int):
+        self.ws = ws
+        self.window = window
+        self.unacked = 0
+        self.closed = False
+        self.streams: Dict[str, asyncio.Task] = {}
+        self._credit = asyncio.Condition()
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, frame: Dict[str, Any], flow: bool = False) -> None:
+        text = json.dumps(frame, separators=(",", ":"))
+        if flow:
+            async with self._credit:
+                # strictly below the window, so one oversized delta can't wedge the stream
+                await self._credit.wait_for(lambda: self.unacked < self.window or self.closed)
+                self.unacked += len(text)
+        if self.closed:
+            return
+        async with self._send_lock:
+            await self.ws.send_text(text)
+
+    async def ack(self, n: int) -> None:
+        async with self._credit:
+            self.unacked = max(0, self.unacked - n)
+            self._credit.notify_all()
+
+    async def error(self, sid: Optional[str], code: int, msg: str) -> None:
+        await self.send({"t": "error", "id": sid, "code": code, "msg": msg})
+
+    async def close(self) -> None:
+        self.closed = True
+        async with self._credit:
+            self._credit.notify_all()
+        tasks = list(self.streams.values())
+        for t in tasks:
+            t.cancel()   # unwinds provider.stream_chat -> upstream connection closed
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _generate(conn: _Conn, sid: str, model: Optional[str], req: ChatRequest) -> None:
+    accepted = perf_counter()
+    try:
+        name = model or next(iter(registry.models.keys()))
+        entry = registry.entry(name)
+    except (KeyError, StopIteration) as e:
+        return await conn.error(sid, 404, str(e) or "No models configured")
+    if not registry.is_ready(name):
+        return await conn.error(sid, 503, f"Model {name} is {registry.status(name)}")
+    try:
+        req, budget = await budget_request(entry, req, settings.TOKEN_MIN_OUTPUT)
+    except ContextOverflow as e:
+        return await conn.error(sid, 413, str(e))
+    if budget:
+        LLM_PROMPT_TOKENS.labels(name).inc(budget.prompt_tokens)
+
+    ttft, gap = LLM_TTFT.labels(name), LLM_TOKEN_GAP.labels(name)
+    first = last = None
+    n, out = 0, []
+    reason = "stop"
+    try:
+        LLM_DISPATCH.labels(name).observe(perf_counter() - accepted)
+        async with entry.lease() as provider:
+            with span("llm.generate", {"llm.model": name, "llm.transport": "ws"}):
+                async for chunk in provider.stream_chat(req):
+                    now = perf_counter()
+                    if last is None:
+                        first = now
+                        ttft.observe(now - accepted)
+                    else:
+                        gap.observe(now - last)
+                    last = now
+                    n += 1
+                    out.append(chunk)
+                    await conn.send({"t": "delta", "id": sid, "d": chunk}, flow=True)
+    except asyncio.CancelledError:
+        if conn.closed:
+            raise
+        reason = "cancelled"   # client cancel frame; the connection stays up
+    except Exception as e:
+        log.warning("ws stream %s on %s failed: %s", sid, name, e)
+        return await conn.error(sid, 502, f"{e.__class__.__name__}: {e}")
+    finally:
+        LLM_TOKENS.labels(name).inc(n)
+
+    completion = None
+    if entry.tokenizer and out:
+        try:
+            completion = await entry.tokenizer.count("".join(out))
+        except Exception:
+            pass
+    await conn.send({
+        "t": "usage", "id": sid,
+        "prompt_tokens": budget.prompt_tokens if budget else None,
+        "completion_tokens": completion, "chunks": n,
+        "ttft_ms": round((first - accepted) * 1000, 1) if first else None,
+        "ms": round((perf_counter() - accepted) * 1000, 1),
+    })
+    await conn.send({"t": "done", "id": sid, "reason": reason})
+
+
+async def _stream(conn: _Conn, sid: str, model: Optional[str], req: ChatRequest) -> None:
+    try:
+        await _generate(conn, sid, model, req)
+    except asyncio.CancelledError:
+        if conn.closed:
+            raise
+        await conn.send({"t": "done", "id": sid, "reason": "cancelled"})   # cancelled before dispatch
+    except Exception:
+        if not conn.closed:   # a send racing the disconnect is expected; anything else isn't
+            log.exception("ws stream %s failed", sid)
+
+
+async def _dispatch(conn: _Conn, frame: Dict[str, Any]) -> None:
+    kind, sid = frame.get("t"), frame.get("id")
+    if kind == "ack":
+        await conn.ack(int(frame.get("n") or 0))
+    elif kind == "cancel":
+        task = conn.streams.get(sid)
+        if task:
+            task.cancel()
+    elif kind == "gen":
+        if not isinstance(sid, str) or not sid:
+            return await conn.error(sid, 400, "gen needs a string id")
+        if sid in conn.streams:
+            return await conn.error(sid, 409, f"Stream {sid} is already running")
+        if len(conn.streams) >= settings.WS_MAX_STREAMS:
+            return await conn.error(sid, 429, f"At most {settings.WS_MAX_STREAMS} concurrent streams per connection")
+        try:
+            req = ChatRequest.model_validate(frame)
+        except ValidationError as e:
+            return await conn.error(sid, 400, str(e))
+        task = asyncio.create_task(_stream(conn, sid, frame.get("model"), req))
+        conn.streams[sid] = task
+        task.add_done_callback(lambda _t: conn.streams.pop(sid, None))
+    else:
+        await conn.error(sid, 400, f"Unknown frame type: {kind!r}")
+
+
+@router.websocket("/api/ws")
+async def ws_generate(ws: WebSocket):
+    if not _origin_ok(ws):
+        return await ws.close(code=POLICY_VIOLATION, reason="Origin not allowed")
+    user = await asyncio.to_thread(_auth, ws)
+    if user is None:
+        return await ws.close(code=POLICY_VIOLATION, reason="Not authenticated")
+    await ws.accept()
+    conn = _Conn(ws, settings.WS_WINDOW_BYTES)
+    try:
+        while True:
+            raw = await ws.receive_text()
+            try:
+                frame = json.loads(raw)
+                if not isinstance(frame, dict):
+                    raise ValueError("frame must be an object")
+                await _dispatch(conn, frame)
+            except (ValueError, TypeError) as e:
+                await conn.error(None, 400, f"Bad frame: {e}")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await conn.close()
@@ -0,0 +1,106 @@
+# app/serve.py
+"""
+Production launcher: one runtime owner + N prefork HTTP workers.
+
+    python -m app.serve --workers 8 --host 0.0.0.0 --port 8000
+
+The launcher creates the schema. The owner process (APP_ROLE=owner) runs the upload
+sweeper and the llama.cpp runtimes with their supervisors, and publishes runtime state to
+the shared store (app/shared.py). Workers (APP_ROLE=worker) run under uvicorn's process
+manager. They hold provider clients only and read runtime readiness from the store.
+Admin restarts and reloads are queued for the owner. The login throttle is shared, and
+/metrics on any worker reports the sum over all processes.
+`uvicorn app.main:app --reload` (APP_ROLE=all) keeps doing everything in one process; it is
+also the only mode for `type: transformers` models, which load weights into the serving process.
+"""
+from __future__ import annotations
+import argparse, asyncio, logging, os, signal, subprocess, sys
+
+
+async def run_owner() -> None:
+    from .config import settings
+    from .llm.registry import registry
+    from .metrics import publisher
+    from .routers import uploads
+
+    uploads.BASE.mkdir(parents=True, exist_ok=True)
+    sweeper = asyncio.create_task(uploads.sweeper_task())
+    metrics = asyncio.create_task(publisher())
+    registry.load("models.yaml")
+    await registry.startup()
+    registry.watch(settings.MODELS_RELOAD_INTERVAL)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    parent = os.getppid()
+    try:
+        # also exit if the launcher dies without signalling us (runtimes must not be orphaned)
+        while not stop.is_set() and os.getppid() == parent:
+            try:
+                await asyncio.wait_for(stop.wait(), 1.0)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        sweeper.cancel()
+        await registry.shutdown()
+        metrics.cancel()
+        await asyncio.gather(metrics, return_exceptions=True)
+
+
+def _stop_owner(owner: subprocess.Popen, grace: float = 30.0) -> None:
+    if owner.poll() is None:
+        owner.terminate()
+        try:
+            owner.wait(grace)   # runtimes get their own SIGTERM grace inside
+        except subprocess.TimeoutExpired:
+            owner.kill()
+            owner.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description="Multi-worker production launcher.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="HTTP worker processes")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--owner", action="store_true", help=argparse.SUPPRESS)  # internal: run the owner
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    if args.owner:
+        asyncio.run(run_owner())
+        return 0
+
+    # workers hold provider clients only; refuse models that would load weights in each of them
+    from .llm.registry import Registry
+    in_process = Registry.in_process_models("models.yaml")
+    if in_process:
+        parser.error(f"models.yaml: {', '.join(in_process)} load the model in-process (type transformers) "
+                     "and can't be served by multiple workers; serve them via type: openai "
+                     "(llama-server, vLLM) or run `uvicorn app.main:app` instead")
+
+    # schema before anything serves: workers skip create_all
+    from .db import Base, engine
+    from . import models  # noqa: F401  (registers the tables)
+    Base.metadata.create_all(engine)
+    # metric totals restart with the deployment (exited processes' values persist until then)
+    from .metrics import clear_published
+    clear_published()
+
+    owner = subprocess.Popen([sys.executable, "-m", "app.serve", "--owner", "--log-level", args.log_level],
+                             env={**os.environ, "APP_ROLE": "owner"})
+    # inherited by the spawned workers; settings are read per process
+    os.environ["APP_ROLE"] = "worker"
+    import uvicorn
+    try:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=max(1, args.workers),
+                    log_level=args.log_level, proxy_headers=True)
+    finally:
+        _stop_owner(owner)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# app/shared.py
+"""
+Cross-process state for multi-worker deployments (see app/serve.py).
+
+Holds the login throttle, runtime status published by the runtime owner, commands for
+it (restart, reload), each worker's interactive stream counts (app/llm/registry.py) and
+each process's metric values (app/metrics.py). It is backed by one SQLite file in WAL
+mode, so all processes on the host share it without an extra service. The file is opened
+on first use, not at import.
+"""
+from __future__ import annotations
+import json, sqlite3, threading, time
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL);
+CREATE TABLE IF NOT EXISTS events (key TEXT NOT NULL, ts REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_events_key_ts ON events (key, ts);
+CREATE TABLE IF NOT EXISTS queue (id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, value TEXT NOT NULL);
+"""
+
+
+class SharedStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()   # sqlite connections are per thread
+
+    def _conn(self) -> sqlite3.Connection:
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("PRAGMA synchronous=NORMAL")
+            c.executescript(_SCHEMA)
+            self._local.conn = c
+        return c
+
+    # --- key/value (JSON values, optional TTL) ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._conn().execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.time() + ttl if ttl else None
+        self._conn().execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                             (key, json.dumps(value), expires))
+
+    def scan(self, prefix: str) -> Dict[str, Any]:
+        """All live keys starting with `prefix`."""
+        now = time.time()
+        rows = self._conn().execute("SELECT key, value FROM kv WHERE key >= ? AND key < ? AND (expires IS NULL OR expires >= ?)",
+                                    (prefix, prefix + "\uffff", now)).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def delete_prefix(self, prefix: str) -> None:
+        self._conn().execute("DELETE FROM kv WHERE key >= ? AND key < ?", (prefix, prefix + "\uffff"))
+
+    def incr(self, key: str) -> int:
+        c = self._conn()
+        with c:
+            c.execute("BEGIN IMMEDIATE")
+            cur = self.get(key, 0)
+            self.set(key, cur + 1)
+        return cur + 1
+
+    # --- sliding-window event counts (login throttle) ---
+
+    def hit(self, key: str, window: float) -> int:
+        """Record an event now; returns the number of events for `key` within `window` seconds."""
+        now = time.time()
+        c = self._conn()
+        with c:
+            c.execute("BEGIN IMMEDIATE")
+            c.execute("DELETE FROM events WHERE key = ? AND ts < ?", (key, now - window))
+            c.execute("INSERT INTO events (key, ts) VALUES (?, ?)", (key, now))
+            return c.execute("SELECT COUNT(*) FROM events WHERE key = ?", (key,)).fetchone()[0]
+
+    def count(self, key: str, window: float) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM events WHERE key = ? AND ts >= ?",
+                                    (key, time.time() - window)).fetchone()[0]
+
+    # --- work queue (commands for the runtime owner) ---
+
+    def push(self, topic: str, value: Any) -> None:
+        self._conn().execute("INSERT INTO queue (topic, value) VALUES (?, ?)", (topic, json.dumps(value)))
+
+    def pop_all(self, topic: str) -> List[Any]:
+        c = self._conn()
+        with c:
+            c.execute("BEGIN IMMEDIATE")
+            rows = c.execute("SELECT id, value FROM queue WHERE topic = ? ORDER BY id", (topic,)).fetchall()
+            if rows:
+                c.execute("DELETE FROM queue WHERE topic = ? AND id <= ?", (topic, rows[-1][0]))
+        return [json.loads(v) for _, v in rows]
+
+
+store = SharedStore(settings.SHARED_STATE_DB)
@@ -0,0 +1,34 @@
+# app/tracing.py
+"""
+Optional OpenTelemetry spans. Enabled with OTEL_ENABLED=true when `opentelemetry-api`
+is installed (exporter/SDK setup is left to the deployment, e.g. `opentelemetry-instrument`);
+otherwise every helper is a no-op.
+"""
+from __future__ import annotations
+from contextlib import nullcontext
+from typing import Dict, Optional
+
+from .config import settings
+
+_tracer = None
+_propagate = None
+if settings.OTEL_ENABLED:
+    try:
+        from opentelemetry import trace as _trace, propagate as _propagate
+        _tracer = _trace.get_tracer("warriorgpt")
+    except ImportError:
+        _propagate = None
+
+
+def span(name: str, attributes: Optional[Dict[str, object]] = None):
+    """Context manager starting a child of the current span (nullcontext when tracing is off)."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes or {})
+
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add W3C traceparent headers so upstream calls join the request's trace."""
+    if _propagate is not None:
+        _propagate.inject(headers)
+    return headers
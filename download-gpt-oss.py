@@ -1,8 +1,8 @@
 import os
 import argparse
 import logging
-from tqdm import tqdm
-from huggingface_hub import hf_hub_download, list_repo_files
+
+from app.download import download
 
 # === Logging Setup ===
 os.makedirs("logs", exist_ok=True)
@@ -12,20 +12,13 @@ logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
-def download_model(model_repo: str, local_dir: str):
+def download_model(model_repo: str, local_dir: str, workers: int = 4, mirror: str | None = None):
     print(f"📥 Downloading {model_repo} to {local_dir}")
     try:
-        files = list_repo_files(model_repo)
-        os.makedirs(local_dir, exist_ok=True)
-
-        for file in tqdm(files, desc="📦 Downloading files", unit="file"):
-            hf_hub_download(
-                repo_id=model_repo,
-                filename=file,
-                local_dir=local_dir,
-                force_download=False
-            )
-
+        results = download(model_repo, local_dir, workers=workers, mirror=mirror)
+        failed = [r for r in results if r.status == "failed"]
+        if failed:
+            raise RuntimeError(", ".join(f"{r.path}: {r.error}" for r in failed))
         print("✅ Download complete.")
         logging.info(f"Model {model_repo} successfully downloaded to {local_dir}")
     except Exception as e:
@@ -41,12 +34,14 @@ def main():
         choices=["gpt-oss-20b", "gpt-oss-120b"],
         help="Which model to download: gpt-oss-20b or gpt-oss-120b"
     )
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent file downloads")
+    parser.add_argument("--mirror", type=str, default=None, help="Local mirror directory (offline)")
     args = parser.parse_args()
 
     model_repo = f"openai/{args.model}"
     local_dir = f"./models/{args.model}"
 
-    download_model(model_repo, local_dir)
+    download_model(model_repo, local_dir, workers=args.workers, mirror=args.mirror)
 
 if __name__ == "__main__":
     main()
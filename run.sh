@@ -8,4 +8,9 @@ if not Path(".env").exists() and Path(".env.example").exists():
 print("Using .env:", Path(".env").resolve())
 PY
 
-uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+# dev: single process with auto-reload, serving static/ as-is so edits show up on refresh.
+# production: fingerprint + precompress static/ into static/dist/ (immutable caching), then
+# one runtime owner + N workers:
+#   python -m app.assets build
+#   python -m app.serve --host 0.0.0.0 --port 8000 --workers "$(nproc)"
+STATIC_DIST=0 uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
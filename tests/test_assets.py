@@ -0,0 +1,89 @@
+# tests/test_assets.py
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.assets import DIST, IndexCache, PrecompressedStaticFiles, build
+
+BROWSER = "gzip, deflate, br"
+JS = "script.0123456789.js"
+
+
+def _client(tmp_path, variants):
+    body = b"console.log('hello');\n" * 100
+    (tmp_path / JS).write_bytes(body)
+    if "gzip" in variants:
+        (tmp_path / (JS + ".gz")).write_bytes(gzip.compress(body))
+    if "br" in variants:
+        (tmp_path / (JS + ".br")).write_bytes(b"not really brotli")
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(tmp_path)), name="static")
+    return TestClient(app), body
+
+
+def _get(client, accept):
+    # raw bytes as stored; the test client must not decode them
+    with client.stream("GET", f"/static/{JS}", headers={"Accept-Encoding": accept}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+def test_gzip_served_when_br_accepted_but_missing(tmp_path):
+    client, body = _client(tmp_path, {"gzip"})
+    r, raw = _get(client, BROWSER)
+    assert r.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == body
+    assert "immutable" in r.headers["cache-control"]
+
+
+def test_br_preferred_when_present(tmp_path):
+    client, _ = _client(tmp_path, {"gzip", "br"})
+    r, raw = _get(client, BROWSER)
+    assert r.headers["content-encoding"] == "br"
+    assert raw == b"not really brotli"
+
+
+def test_identity_without_variants(tmp_path):
+    client, body = _client(tmp_path, set())
+    r, raw = _get(client, BROWSER)
+    assert "content-encoding" not in r.headers
+    assert raw == body
+
+
+def _site(tmp_path, js):
+    (tmp_path / "index.html").write_text('<script src="./script.js"></script>')
+    (tmp_path / "script.js").write_text(js)
+    return build(tmp_path)["script.js"]
+
+
+def test_rebuild_keeps_previous_build_and_prunes_older(tmp_path):
+    first = _site(tmp_path, "one();" * 100)
+    second = _site(tmp_path, "two();" * 100)
+    dist = tmp_path / DIST
+    assert (dist / first).exists() and (dist / second).exists()
+    third = _site(tmp_path, "three();" * 100)
+    assert not (dist / first).exists() and not (dist / (first + ".gz")).exists()
+    assert (dist / second).exists() and (dist / third).exists()
+
+
+def _index_client(index):
+    app = FastAPI()
+
+    @app.get("/")
+    def root(request: Request):
+        return index.response(request)
+    return TestClient(app)
+
+
+def test_index_follows_rebuild(tmp_path):
+    client = _index_client(IndexCache(tmp_path))
+    first = _site(tmp_path, "one();" * 100)
+    assert first in client.get("/").text
+    second = _site(tmp_path, "two();" * 100)
+    assert second in client.get("/").text
+
+
+def test_index_ignores_dist_when_disabled(tmp_path):
+    _site(tmp_path, "one();" * 100)
+    client = _index_client(IndexCache(tmp_path, use_dist=False))
+    assert 'src="./script.js"' in client.get("/").text
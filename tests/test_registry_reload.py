@@ -0,0 +1,87 @@
+# tests/test_registry_reload.py
+import asyncio
+
+import yaml
+
+from app.llm.registry import Registry
+from app.llm.runtimes.supervisor import RuntimeSupervisor
+
+
+def _model(name, port, args=()):
+    return {
+        "name": name, "type": "openai",
+        "openai": {"base_url": f"http://127.0.0.1:{port}/v1", "api_key": "", "model": name},
+        "tokenizer": False,
+        "runtime": {"kind": "llama_cpp_server", "bin": "/nonexistent/llama-server",
+                    "host": "127.0.0.1", "port": port, "args": list(args)},
+    }
+
+
+def _write(path, *models):
+    path.write_text(yaml.safe_dump({"models": list(models)}))
+
+
+def _run(tmp_path, monkeypatch, scenario):
+    started = []
+    monkeypatch.setattr(RuntimeSupervisor, "start", lambda self: started.append(self.name))
+    path = tmp_path / "models.yaml"
+
+    async def main():
+        reg = Registry()
+        reg.role = "all"
+        try:
+            await scenario(reg, path, started)
+        finally:
+            await reg.shutdown()
+
+    asyncio.run(main())
+
+
+async def _hold(entry, release: asyncio.Event):
+    async with entry.lease():
+        await release.wait()
+
+
+def test_added_model_starts_while_removed_model_drains(tmp_path, monkeypatch):
+    async def scenario(reg, path, started):
+        _write(path, _model("old", 18201))
+        reg.load(str(path))
+        release = asyncio.Event()
+        stream = asyncio.create_task(_hold(reg.entry("old"), release))
+        await asyncio.sleep(0)
+
+        _write(path, _model("new", 18202))
+        changes = await asyncio.wait_for(reg.reload(), 1.0)   # doesn't wait for the drain
+        assert changes["added"] == ["new"] and changes["removed"] == ["old"]
+        assert started == ["new"]
+
+        release.set()
+        await stream
+
+    _run(tmp_path, monkeypatch, scenario)
+
+
+def test_replacement_runtime_starts_after_its_predecessor_stops(tmp_path, monkeypatch):
+    async def scenario(reg, path, started):
+        _write(path, _model("a", 18201))
+        reg.load(str(path))
+        old = reg.entry("a")
+        release = asyncio.Event()
+        stream = asyncio.create_task(_hold(old, release))
+        await asyncio.sleep(0)
+
+        _write(path, _model("a", 18201, ["-c", "4096"]))
+        changes = await asyncio.wait_for(reg.reload(), 1.0)
+        assert changes["replaced"] == ["a"]
+        await asyncio.sleep(0.2)
+        assert started == []   # same port: the old server is still draining
+
+        release.set()
+        await stream
+        for _ in range(50):
+            if started:
+                break
+            await asyncio.sleep(0.05)
+        assert started == ["a"] and reg.entry("a") is not old
+
+    _run(tmp_path, monkeypatch, scenario)